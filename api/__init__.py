@@ -1,11 +1,19 @@
 from datetime import timedelta
 import os
+import threading
 from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_restx import Api
 
 from .utils.blacklist_store import is_token_revoked
+from .commands import register_commands
+from .query.q_idempotency import start_idempotency_cleanup
+from .utils.pengaturan_cache import start_pengaturan_listener
+from .utils.representation import output_json
+from .utils.db_instrumentation import register_db_headers
+from .utils.metrics import register_metrics
+from .utils.db_routing import WRITE_LSN_HEADER, register_read_routing
 from .auth import auth_ns
 from .user import user_ns
 from .lokasi import lokasi_ns
@@ -20,7 +28,8 @@ from .laporan import laporan_ns
 from .pengaturan import pengaturan_ns
 
 api = Flask(__name__)
-CORS(api)
+# klien lintas origin membaca LSN tulisan terakhir lalu mengirimnya kembali
+CORS(api, expose_headers=[WRITE_LSN_HEADER])
 
 api.config['JWT_SECRET_KEY'] = os.getenv("JWT_SECRET_KEY")
 api.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=13)  # Atur sesuai kebutuhan
@@ -31,6 +40,36 @@ api.config['JWT_BLACKLIST_TOKEN_CHECKS'] = ['access', 'refresh']
 
 jwt = JWTManager(api)
 
+register_commands(api)
+register_db_headers(api)
+register_metrics(api)
+register_read_routing(api)
+
+_background_lock = threading.Lock()
+_background_started = False
+
+
+def start_background_tasks():
+    """
+    Thread latar per worker, dijalankan sekali setelah fork (hook gunicorn
+    post_worker_init atau request pertama), bukan saat import/CLI:
+    purge Idempotency-Key kedaluwarsa dan LISTEN/NOTIFY cache pengaturan.
+    """
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+
+    start_idempotency_cleanup()
+    start_pengaturan_listener()
+
+
+@api.before_request
+def _ensure_background_tasks():
+    if not _background_started:
+        start_background_tasks()
+
 @jwt.token_in_blocklist_loader
 def check_if_token_revoked(jwt_header, jwt_payload):
     jti = jwt_payload['jti']
@@ -69,6 +108,9 @@ restx_api = Api(
         security='Bearer Auth'
     )
 
+# encoder JSON cepat (orjson) yang menangani date, datetime, dan Decimal
+restx_api.representations['application/json'] = output_json
+
 restx_api.add_namespace(auth_ns, path="/auth")
 restx_api.add_namespace(user_ns, path="/user")
 restx_api.add_namespace(lokasi_ns, path="/lokasi")
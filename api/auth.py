@@ -52,9 +52,14 @@ class LogoutResource(Resource):
     @jwt_required()
     def post(self):
         """akses: admin, kasir"""
-        jti = get_jwt().get('jti')
+        jwt_data = get_jwt()
+        jti = jwt_data.get('jti')
         if jti:
-            add_to_blacklist(jti)
+            try:
+                add_to_blacklist(jti, jwt_data.get('exp'))
+            except SQLAlchemyError as e:
+                logging.error(f"Database error: {str(e)}")
+                return {'status': "Internal server error"}, 500
             return {'status': "Logout berhasil, token di-blacklist"}, 200
         return {'status': "JTI tidak ditemukan"}, 400
 
@@ -0,0 +1,49 @@
+import os
+
+import click
+
+from .query.q_hutang import reconcile_total_hutang
+from .query.q_penjualan_harian import rebuild_penjualan_harian
+from .utils.config import check_pool_capacity
+
+
+def register_commands(app):
+
+    @app.cli.command("rebuild-penjualan-harian")
+    def rebuild_penjualan_harian_command():
+        """Isi ulang rollup penjualan_harian dari histori transaksi."""
+        total = rebuild_penjualan_harian()
+        if total is None:
+            raise click.ClickException("Gagal rebuild penjualan_harian")
+        click.echo(f"penjualan_harian dibangun ulang: {total} baris")
+
+    @app.cli.command("check-pool")
+    @click.option("--workers", type=int, default=lambda: os.getenv("WEB_CONCURRENCY"),
+                  help="Jumlah worker gunicorn (default: WEB_CONCURRENCY)")
+    def check_pool_command(workers):
+        """Cek workers × (pool_size + max_overflow) terhadap max_connections."""
+        if not workers:
+            raise click.UsageError("Isi --workers atau WEB_CONCURRENCY dengan jumlah worker gunicorn")
+        ok = check_pool_capacity(workers)
+        if ok is None:
+            raise click.ClickException("Gagal cek max_connections")
+        click.echo("Kapasitas pool OK" if ok else "Kapasitas pool melebihi max_connections")
+
+    @app.cli.command("reconcile-total-hutang")
+    @click.option("--fix", is_flag=True, help="Perbaiki saldo yang selisih")
+    def reconcile_total_hutang_command(fix):
+        """Cocokkan pelanggan.total_hutang dengan ledger tabel hutang."""
+        selisih = reconcile_total_hutang(fix)
+        if selisih is None:
+            raise click.ClickException("Gagal rekonsiliasi total_hutang")
+        for row in selisih:
+            click.echo(
+                f"{row['id_pelanggan']} {row['nama_pelanggan']}: "
+                f"saldo {row['saldo']} != ledger {row['ledger']}"
+            )
+        if not selisih:
+            click.echo("total_hutang sesuai dengan ledger")
+        elif fix:
+            click.echo(f"{len(selisih)} saldo pelanggan diperbaiki")
+        else:
+            raise click.ClickException(f"{len(selisih)} saldo pelanggan selisih (jalankan dengan --fix)")
@@ -3,6 +3,7 @@ from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required
 from sqlalchemy.exc import SQLAlchemyError
 
+from .utils.decorator import role_required
 from .query.q_hutang import *
 
 hutang_ns = Namespace("hutang", description="Hutang related endpoints")
@@ -17,13 +18,32 @@ hutang_model = hutang_ns.model("Hutang", {
 @hutang_ns.route('/')
 class HutangListResource(Resource):
     @jwt_required()
+    @hutang_ns.doc(params={
+        'id_pelanggan': 'Filter berdasarkan ID pelanggan',
+        'id_lokasi': 'Filter berdasarkan ID lokasi transaksi',
+        'start_date': 'Tanggal hutang mulai (YYYY-MM-DD)',
+        'end_date': 'Tanggal hutang akhir (YYYY-MM-DD)',
+        'min_sisa': 'Sisa hutang minimum',
+        'limit': f'Jumlah data per halaman (maks {HUTANG_MAX_LIMIT})',
+        'cursor': 'Cursor halaman berikutnya (dari next_cursor)'
+    })
     def get(self):
         """akses: admin, kasir"""
         try:
-            result = get_all_hutang()
+            result, next_cursor = get_all_hutang(
+                id_pelanggan=request.args.get("id_pelanggan", type=int),
+                id_lokasi=request.args.get("id_lokasi", type=int),
+                start_date=request.args.get("start_date"),
+                end_date=request.args.get("end_date"),
+                min_sisa=request.args.get("min_sisa", type=int),
+                limit=request.args.get("limit", type=int),
+                cursor=request.args.get("cursor"),
+            )
             if not result:
                 return {'status': 'error', 'message': 'Tidak ada hutang yang ditemukan'}, 401
-            return result, 200
+            return {'data': result, 'next_cursor': next_cursor}, 200
+        except ValueError as ve:
+            return {'status': 'error', 'message': str(ve)}, 400
         except SQLAlchemyError as e:
             logging.error(f"Database error: {str(e)}")
             return {'status': "Internal server error"}, 500
@@ -105,6 +125,36 @@ class HutangListTotalResource(Resource):
             return {'status': "Internal server error"}, 500
 
 
+@hutang_ns.route('/aging')
+class HutangAgingResource(Resource):
+    @role_required('admin')
+    @hutang_ns.doc(params={
+        'id_lokasi': 'Filter berdasarkan ID lokasi',
+        'id_pelanggan': 'Filter berdasarkan ID pelanggan',
+        'sort': 'Urutan total hutang: desc (default) atau asc',
+        'limit': f'Jumlah data per halaman (maks {HUTANG_AGING_MAX_LIMIT})',
+        'cursor': 'Cursor halaman berikutnya (dari next_cursor)'
+    })
+    def get(self):
+        """akses: admin; umur hutang per pelanggan & lokasi (0-30/31-60/61-90/90+ hari)"""
+        try:
+            data, next_cursor = get_hutang_aging(
+                id_lokasi=request.args.get("id_lokasi", type=int),
+                id_pelanggan=request.args.get("id_pelanggan", type=int),
+                sort=request.args.get("sort", "desc"),
+                limit=request.args.get("limit", type=int),
+                cursor=request.args.get("cursor"),
+            )
+            if not data:
+                return {'status': 'error', 'message': 'Tidak ada hutang yang ditemukan'}, 404
+            return {'status': 'success', 'data': data, 'next_cursor': next_cursor}, 200
+        except ValueError as ve:
+            return {'status': 'error', 'message': str(ve)}, 400
+        except SQLAlchemyError as e:
+            logging.error(f"Database error: {str(e)}")
+            return {'status': "Internal server error"}, 500
+
+
 @hutang_ns.route('/total/<int:id_pelanggan>')
 class HutangTotalPerPelangganResource(Resource):
     @jwt_required()
@@ -131,7 +181,17 @@ class BayarHutangResource(Resource):
         try:
             id_pelanggan = payload.get("id_pelanggan")
             jumlah_bayar = payload.get("jumlah_bayar")
-            hasil = bayar_hutang(id_pelanggan, jumlah_bayar)
+
+            # bilangan bulat positif; 50000.0 diterima, true/"50000" ditolak
+            if (
+                isinstance(jumlah_bayar, bool)
+                or not isinstance(jumlah_bayar, (int, float))
+                or not float(jumlah_bayar).is_integer()
+                or jumlah_bayar <= 0
+            ):
+                return {"status": "error", "message": "jumlah_bayar harus bilangan bulat lebih dari 0"}, 400
+
+            hasil = bayar_hutang(id_pelanggan, int(jumlah_bayar))
 
             if not hasil:
                 return {"status": "error", "message": "Pembayaran gagal atau tidak ada hutang aktif"}, 400
@@ -1,32 +1,52 @@
+import os
 from datetime import timedelta, date
 from flask import logging, request
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required
 from sqlalchemy.exc import SQLAlchemyError
 
-from .utils.decorator import role_required
+from .utils.decorator import role_required, statement_timeout
+from .utils.export import EXPORT_FORMATS, stream_export
 from .query.q_laporan import *
+from .query.q_laporan_job import create_laporan_job, get_laporan_job
 
 
 laporan_ns = Namespace("laporan", description="Laporan related endpoints")
 
+# batas durasi query laporan sinkron (ms); laporan lebih berat pakai /laporan/jobs
+LAPORAN_STATEMENT_TIMEOUT = int(os.getenv("LAPORAN_STATEMENT_TIMEOUT_MS", "20000"))
+
+laporan_job_model = laporan_ns.model("LaporanJob", {
+    "jenis": fields.String(required=True, description="Jenis laporan: transaksi, penjualan-item, stok"),
+    "params": fields.Raw(required=False, description="Parameter laporan, mis. {\"start_date\": \"2025-01-01\", \"end_date\": \"2025-01-31\"}"),
+})
+
 @laporan_ns.route('/transaksi')
 class LaporanListResource(Resource):
     @role_required('admin')
+    @statement_timeout(LAPORAN_STATEMENT_TIMEOUT)
     @laporan_ns.param("periode", "Periode data: today, this_week, this_month", type="string")
     @laporan_ns.param("start_date", "Tanggal mulai (YYYY-MM-DD)", type="string")
     @laporan_ns.param("end_date", "Tanggal akhir (YYYY-MM-DD)", type="string")
+    @laporan_ns.param("format", "Ekspor streaming: csv, ndjson", type="string")
     def get(self):
         """akses: admin; Laporan semua transaksi termasuk hutang, modal, dan keuntungan"""
         periode = request.args.get("periode")
         start_date = request.args.get("start_date")
         end_date = request.args.get("end_date")
+        fmt = request.args.get("format")
+
+        if fmt in EXPORT_FORMATS:
+            return stream_export(
+                iter_laporan_transaksi(periode, start_date, end_date), fmt, "laporan_transaksi"
+            )
 
         try:
             result = get_all_laporan_transaksi(periode, start_date, end_date)
             if not result:
                 return {'status': 'error', 'message': 'Tidak ada laporan yang ditemukan'}, 404
-            return {'data': result}, 200
+            ringkasan = get_ringkasan_laporan_transaksi(periode, start_date, end_date)
+            return {'data': result, 'ringkasan': ringkasan}, 200
         except SQLAlchemyError as e:
             logging.error(f"Database error: {str(e)}")
             return {'status': "Internal server error"}, 500
@@ -36,11 +56,13 @@ class LaporanListResource(Resource):
 @laporan_ns.route('/penjualan-item')
 class LaporanPenjualanItemResource(Resource):
     @role_required('admin')
+    @statement_timeout(LAPORAN_STATEMENT_TIMEOUT)
     @laporan_ns.param("id_produk", "Filter berdasarkan ID produk", type="integer")
     @laporan_ns.param("id_lokasi", "Filter berdasarkan ID lokasi", type="integer")
     @laporan_ns.param("periode", "Opsi: hari_ini, minggu_ini, bulan_ini, range", type="string")
     @laporan_ns.param("start_date", "Tanggal awal (YYYY-MM-DD)", type="string")
     @laporan_ns.param("end_date", "Tanggal akhir (YYYY-MM-DD)", type="string")
+    @laporan_ns.param("format", "Ekspor streaming: csv, ndjson", type="string")
     def get(self):
         """
         akses: admin; Laporan penjualan item per produk yang sudah diakumulasi.
@@ -66,6 +88,14 @@ class LaporanPenjualanItemResource(Resource):
         elif periode != "range":
             start_date = end_date = None
 
+        fmt = request.args.get("format")
+        if fmt in EXPORT_FORMATS:
+            try:
+                rows = iter_laporan_penjualan_item(id_produk, id_lokasi, start_date, end_date)
+            except ValueError as ve:
+                return {'status': 'error', 'message': str(ve)}, 400
+            return stream_export(rows, fmt, "laporan_penjualan_item")
+
         try:
             result = get_laporan_penjualan_item_grouped(
                 id_produk=id_produk,
@@ -76,6 +106,8 @@ class LaporanPenjualanItemResource(Resource):
             if not result:
                 return {'status': 'error', 'message': 'Tidak ada data penjualan item ditemukan'}, 404
             return {'data': result}, 200
+        except ValueError as ve:
+            return {'status': 'error', 'message': str(ve)}, 400
         except Exception as e:
             logging.error(f"Error: {str(e)}")
             return {'status': 'error', 'message': 'Terjadi kesalahan'}, 500
@@ -84,6 +116,7 @@ class LaporanPenjualanItemResource(Resource):
 @laporan_ns.route('/stok')
 class LaporanStokResource(Resource):
     @role_required('admin')
+    @statement_timeout(LAPORAN_STATEMENT_TIMEOUT)
     @laporan_ns.param("id_produk", "Filter berdasarkan ID produk", type="integer")
     @laporan_ns.param("id_lokasi", "Filter berdasarkan ID lokasi", type="integer")
     def get(self):
@@ -104,6 +137,41 @@ class LaporanStokResource(Resource):
             return {'status': "Internal server error"}, 500
 
 
+"""#=== Job laporan asinkron ===#"""
+@laporan_ns.route('/jobs')
+class LaporanJobListResource(Resource):
+    @role_required('admin')
+    @laporan_ns.expect(laporan_job_model)
+    def post(self):
+        """
+        akses: admin; Antrekan laporan berat (transaksi, penjualan-item, stok).
+        Parameter sama dipakai ulang selama belum ada data baru.
+        """
+        payload = request.get_json() or {}
+        try:
+            job = create_laporan_job(payload.get("jenis"), payload.get("params") or {})
+            if not job:
+                return {'status': "Internal server error"}, 500
+            return {'data': job}, 202
+        except ValueError as ve:
+            return {'status': 'error', 'message': str(ve)}, 400
+
+
+@laporan_ns.route('/jobs/<string:id_job>')
+class LaporanJobDetailResource(Resource):
+    @role_required('admin')
+    def get(self, id_job):
+        """akses: admin; Status dan hasil job laporan"""
+        try:
+            job = get_laporan_job(id_job)
+            if not job:
+                return {'status': 'error', 'message': 'Job laporan tidak ditemukan'}, 404
+            return {'data': job}, 200
+        except SQLAlchemyError as e:
+            logging.error(f"Database error: {str(e)}")
+            return {'status': "Internal server error"}, 500
+
+
 """#=== Filter function ===#"""
 @laporan_ns.route('/filter/produk-terjual')
 class ProdukTerjualResource(Resource):
@@ -4,6 +4,7 @@ from flask_jwt_extended import jwt_required
 from sqlalchemy.exc import SQLAlchemyError
 
 from .utils.decorator import role_required
+from .utils.resource_version import conditional_get
 from .query.q_lokasi import *
 
 lokasi_ns = Namespace("lokasi", description="Lokasi related endpoints")
@@ -16,6 +17,7 @@ lokasi_model = lokasi_ns.model("Lokasi", {
 @lokasi_ns.route('/')
 class LokasiListResource(Resource):
     @jwt_required()
+    @conditional_get("lokasi")
     def get(self):
         """akses: admin, kasir"""
         try:
@@ -41,6 +41,8 @@ class MutasiStokListResource(Resource):
             if not data:
                 return {"status": "error", "message": "Tidak ada mutasi stok ditemukan"}, 404
             return {"status": "success", "data": data}, 200
+        except ValueError as ve:
+            return {"status": "error", "message": str(ve)}, 400
         except SQLAlchemyError as e:
             logging.error(f"Database error: {str(e)}")
             return {"status": "error", "message": "Internal server error"}, 500
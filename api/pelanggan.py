@@ -5,6 +5,7 @@ from flask_jwt_extended import jwt_required
 from sqlalchemy.exc import SQLAlchemyError
 
 from .query.q_pelanggan import *
+from .utils.metrics import POIN_REDEEM_TOTAL
 
 pelanggan_ns = Namespace("pelanggan", description="Pelanggan related endpoints")
 
@@ -96,6 +97,41 @@ class PelangganListResource(Resource):
             }, 500
 
 
+@pelanggan_ns.route('/search')
+class PelangganSearchResource(Resource):
+
+    @jwt_required()
+    @pelanggan_ns.param("q", "Kata kunci nama atau kontak (min. 3 karakter)", type="string")
+    @pelanggan_ns.param("limit", "Jumlah hasil maksimum (default 10, maks 25)", type="integer")
+    def get(self):
+        """akses: admin, kasir; pencarian typeahead pelanggan"""
+
+        try:
+
+            result = search_pelanggan(
+                request.args.get("q"),
+                request.args.get("limit")
+            )
+
+            return {
+                'data': result
+            }, 200
+
+        except ValueError as ve:
+
+            return {
+                "status": "error",
+                "message": str(ve)
+            }, 400
+
+        except SQLAlchemyError as e:
+            logging.error(f"Database error: {str(e)}")
+
+            return {
+                'status': 'Internal server error'
+            }, 500
+
+
 @pelanggan_ns.route('/<int:id>')
 class PelangganDetailResource(Resource):
 
@@ -261,6 +297,8 @@ class PelangganRedeemPoinResource(Resource):
                     "message": "Gagal redeem poin"
                 }, 400
 
+            POIN_REDEEM_TOTAL.inc(redeemed["poin_digunakan"])
+
             return {
                 "data": redeemed,
                 "status": "Redeem poin berhasil"
@@ -9,6 +9,7 @@ from flask_jwt_extended import jwt_required
 from sqlalchemy.exc import SQLAlchemyError
 
 from .query.q_pengaturan import *
+from .utils.resource_version import conditional_get
 
 
 pengaturan_ns = Namespace(
@@ -38,6 +39,7 @@ pengaturan_model = pengaturan_ns.model("Pengaturan", {
 class PengaturanResource(Resource):
 
     @jwt_required()
+    @conditional_get("pengaturan")
     def get(self):
         """
         akses: admin
@@ -4,6 +4,7 @@ from flask_jwt_extended import jwt_required
 from sqlalchemy.exc import SQLAlchemyError
 
 from .utils.decorator import role_required
+from .utils.resource_version import conditional_get
 from .query.q_produk import *
 
 produk_ns = Namespace("produk", description="Produk related endpoints")
@@ -22,6 +23,7 @@ produk_model = produk_ns.model("Produk", {
 @produk_ns.route('/')
 class ProdukListResource(Resource):
     @jwt_required()
+    @conditional_get("produk")
     def get(self):
         """akses: admin, kasir"""
         try:
@@ -47,6 +49,38 @@ class ProdukListResource(Resource):
     #         return {'status': "Internal server error"}, 500
 
 
+@produk_ns.route('/search')
+class ProdukSearchResource(Resource):
+    @jwt_required()
+    @produk_ns.param("q", "Kata kunci nama produk atau barcode (min. 3 karakter)", type="string")
+    @produk_ns.param("limit", "Jumlah hasil maksimum (default 10, maks 25)", type="integer")
+    def get(self):
+        """akses: admin, kasir; pencarian typeahead produk"""
+        try:
+            result = search_produk(request.args.get("q"), request.args.get("limit"))
+            return {'data': result}, 200
+        except ValueError as ve:
+            return {'status': 'error', 'message': str(ve)}, 400
+        except SQLAlchemyError as e:
+            logging.error(f"Database error: {str(e)}")
+            return {'status': "Internal server error"}, 500
+
+
+@produk_ns.route('/barcode/<string:code>')
+class ProdukBarcodeResource(Resource):
+    @jwt_required()
+    def get(self, code):
+        """akses: admin, kasir; lookup scan barcode dari cache katalog"""
+        try:
+            produk = get_produk_by_barcode(code)
+            if not produk:
+                return {'status': 'error', 'message': 'Produk dengan barcode tersebut tidak ditemukan'}, 404
+            return {'data': produk}, 200
+        except SQLAlchemyError as e:
+            logging.error(f"Database error: {str(e)}")
+            return {'status': "Internal server error"}, 500
+
+
 @produk_ns.route('/<int:id>')
 class ProdukDetailResource(Resource):
     @jwt_required()
@@ -1,22 +1,99 @@
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
-from ..utils.config import get_connection, get_wita
+from ..utils.config import get_connection, get_wita, set_long_statement_timeout
+from ..utils.db_routing import get_read_connection
+from ..utils.helper import date_range_filter, decode_cursor, encode_cursor
+from ..utils.resource_version import bump_resource_version
 
 
-def get_all_hutang():
-    engine = get_connection()
+HUTANG_DEFAULT_LIMIT = 50
+HUTANG_MAX_LIMIT = 200
+HUTANG_AGING_DEFAULT_LIMIT = 50
+HUTANG_AGING_MAX_LIMIT = 200
+
+
+def adjust_total_hutang(connection, id_pelanggan, delta):
+    """Menyesuaikan saldo pelanggan.total_hutang di dalam transaksi pemanggil."""
+    if not id_pelanggan or not delta:
+        return
+    connection.execute(text("""
+        UPDATE pelanggan
+        SET total_hutang = total_hutang + :delta
+        WHERE id_pelanggan = :id_pelanggan
+    """), {"id_pelanggan": id_pelanggan, "delta": delta})
+
+
+def _sisa_aktif(row):
+    # kontribusi satu baris hutang ke saldo total_hutang
+    if row and row["status"] == 1 and row["status_hutang"] == 'belum lunas':
+        return row["sisa_hutang"]
+    return 0
+
+
+def get_all_hutang(id_pelanggan=None, id_lokasi=None, start_date=None, end_date=None,
+                   min_sisa=None, limit=None, cursor=None):
+    """
+    Hutang belum lunas dengan filter opsional, terbaru dulu; keyset pagination
+    pada id_hutang. Mengembalikan (data, next_cursor).
+    """
+    limit = max(1, min(limit or HUTANG_DEFAULT_LIMIT, HUTANG_MAX_LIMIT))
+    conditions = ["h.status = 1", "h.status_hutang = 'belum lunas'"]
+    params = {"limit": limit + 1}
+
+    if id_pelanggan:
+        conditions.append("h.id_pelanggan = :id_pelanggan")
+        params["id_pelanggan"] = id_pelanggan
+
+    if id_lokasi:
+        conditions.append("t.id_lokasi = :id_lokasi")
+        params["id_lokasi"] = id_lokasi
+
+    if start_date or end_date:
+        # satu tanggal saja = filter satu hari
+        clause, range_params = date_range_filter(
+            "h.created_at", start_date or end_date, end_date or start_date, "created"
+        )
+        conditions.append(clause)
+        params.update(range_params)
+
+    if min_sisa is not None:
+        conditions.append("h.sisa_hutang >= :min_sisa")
+        params["min_sisa"] = min_sisa
+
+    if cursor:
+        (cursor_id,) = decode_cursor(cursor, 1)
+        try:
+            params["cursor_id"] = int(cursor_id)
+        except ValueError:
+            raise ValueError("Cursor tidak valid.")
+        conditions.append("h.id_hutang < :cursor_id")
+
+    engine = get_read_connection()
     try:
         with engine.connect() as connection:
-            result = connection.execute(text("""
-                SELECT id_hutang, id_transaksi, id_pelanggan, sisa_hutang, status_hutang
-                FROM hutang
-                WHERE status = 1
-                AND status_hutang = 'belum lunas';   
-            """)).mappings().fetchall()
-            return [dict(row) for row in result]
+            result = connection.execute(text(f"""
+                SELECT h.id_hutang, h.id_transaksi, h.id_pelanggan, t.id_lokasi,
+                    h.sisa_hutang, h.status_hutang, h.created_at
+                FROM hutang h
+                LEFT JOIN transaksi t ON h.id_transaksi = t.id_transaksi
+                WHERE {" AND ".join(conditions)}
+                ORDER BY h.id_hutang DESC
+                LIMIT :limit
+            """), params).mappings().fetchall()
+            rows = [dict(row) for row in result]
+
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1]["id_hutang"])
+
+            return rows, next_cursor
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
-        return []
+        return [], None
     
 def insert_hutang(data):
     timestamp_wita = get_wita()
@@ -26,9 +103,11 @@ def insert_hutang(data):
             result = connection.execute(text("""
                 INSERT INTO hutang (id_transaksi, id_pelanggan, sisa_hutang, status_hutang, status, created_at, updated_at)
                 VALUES (:id_transaksi, :id_pelanggan, :sisa_hutang, :status_hutang, 1, :timestamp_wita, :timestamp_wita)
-                RETURNING sisa_hutang, status_hutang
+                RETURNING id_pelanggan, sisa_hutang, status_hutang, status
             """), {**data, "timestamp_wita": timestamp_wita}).mappings().fetchone()
-            return dict(result)
+            adjust_total_hutang(connection, result["id_pelanggan"], _sisa_aktif(result))
+            bump_resource_version(connection, "hutang")
+            return {"sisa_hutang": result["sisa_hutang"], "status_hutang": result["status_hutang"]}
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return None
@@ -54,15 +133,28 @@ def update_hutang(id_hutang, data):
     engine = get_connection()
     try:
         with engine.begin() as connection:
+            lama = connection.execute(text("""
+                SELECT id_pelanggan, sisa_hutang, status_hutang, status
+                FROM hutang
+                WHERE id_hutang = :id_hutang AND status_hutang = 'belum lunas'
+                FOR UPDATE
+            """), {"id_hutang": id_hutang}).mappings().fetchone()
+
+            if not lama:
+                return None
+
             result = connection.execute(
                 text("""
                     UPDATE hutang SET sisa_hutang = :sisa_hutang, status_hutang = :status_hutang, updated_at = :timestamp_wita
-                    WHERE id_hutang = :id_hutang AND status_hutang = 'belum lunas' RETURNING sisa_hutang, status_hutang;
+                    WHERE id_hutang = :id_hutang RETURNING sisa_hutang, status_hutang, status;
                     """
                     ),
                 {**data, "id_hutang": id_hutang, "timestamp_wita": timestamp_wita}
-            ).fetchone()
-            return result
+            ).mappings().fetchone()
+
+            adjust_total_hutang(connection, lama["id_pelanggan"], _sisa_aktif(result) - _sisa_aktif(lama))
+            bump_resource_version(connection, "hutang")
+            return (result["sisa_hutang"], result["status_hutang"])
     except SQLAlchemyError as e:
         print(f"Error: {e}")
         return None
@@ -76,10 +168,17 @@ def delete_hutang(id_hutang):
                 text("""UPDATE hutang SET status = 0, updated_at = :timestamp_wita 
                     WHERE status = 1 
                     AND id_hutang = :id_hutang
-                    RETURNING id_hutang;"""),
+                    RETURNING id_hutang, id_pelanggan, sisa_hutang, status_hutang;"""),
                 {"id_hutang": id_hutang, "timestamp_wita": timestamp_wita}
-            ).fetchone()
-            return result
+            ).mappings().fetchone()
+
+            if not result:
+                return None
+
+            if result["status_hutang"] == 'belum lunas':
+                adjust_total_hutang(connection, result["id_pelanggan"], -result["sisa_hutang"])
+            bump_resource_version(connection, "hutang")
+            return (result["id_hutang"],)
     except SQLAlchemyError as e:
         print(f"Error: {e}")
         return None
@@ -88,23 +187,23 @@ def get_total_hutang_per_pelanggan(id_pelanggan=None):
     engine = get_connection()
     try:
         with engine.connect() as connection:
+            # saldo dari pelanggan.total_hutang, tanpa SUM ulang tabel hutang
             query = """
                 SELECT
-                    h.id_pelanggan,
+                    p.id_pelanggan,
                     p.nama_pelanggan,
                     p.kontak,
-                    COALESCE(SUM(h.sisa_hutang), 0) AS total_sisa_hutang
-                FROM hutang h
-                JOIN pelanggan p ON h.id_pelanggan = p.id_pelanggan
-                WHERE h.status = 1 AND h.status_hutang = 'belum lunas'
+                    p.total_hutang AS total_sisa_hutang
+                FROM pelanggan p
+                WHERE p.total_hutang > 0
             """
             params = {}
 
             if id_pelanggan:
-                query += " AND h.id_pelanggan = :id_pelanggan"
+                query += " AND p.id_pelanggan = :id_pelanggan"
                 params["id_pelanggan"] = id_pelanggan
 
-            query += " GROUP BY h.id_pelanggan, p.nama_pelanggan, p.kontak ORDER BY total_sisa_hutang DESC"
+            query += " ORDER BY p.total_hutang DESC"
 
             result = connection.execute(text(query), params).mappings().fetchall()
             return [dict(row) for row in result]
@@ -118,16 +217,13 @@ def count_total_hutang_by_id(id_pelanggan):
         with engine.connect() as connection:
             result = connection.execute(text("""
                 SELECT 
-                    h.id_pelanggan,
-                    COALESCE(SUM(h.sisa_hutang), 0) AS total_hutang,
+                    p.id_pelanggan,
+                    p.total_hutang,
                     p.nama_pelanggan,
                     p.kontak
-                FROM hutang h
-                INNER JOIN pelanggan p ON h.id_pelanggan = p.id_pelanggan   
-                WHERE h.status = 1 
-                AND h.status_hutang = 'belum lunas' 
-                AND h.id_pelanggan = :id_pelanggan
-                GROUP BY h.id_pelanggan, p.nama_pelanggan, p.kontak
+                FROM pelanggan p
+                WHERE p.id_pelanggan = :id_pelanggan
+                AND p.total_hutang > 0
             """), {"id_pelanggan": id_pelanggan}).mappings().fetchone()
 
             if not result:
@@ -146,61 +242,220 @@ def count_total_hutang_by_id(id_pelanggan):
         print(f"Error: {e}")
         return []
 
+def reconcile_total_hutang(fix=False):
+    """
+    Membandingkan pelanggan.total_hutang dengan SUM ledger hutang.
+    Mengembalikan daftar selisih; jika fix=True saldo diperbaiki sekalian.
+    """
+    engine = get_connection()
+    try:
+        with engine.begin() as connection:
+            set_long_statement_timeout(connection)
+            result = connection.execute(text("""
+                SELECT p.id_pelanggan, p.nama_pelanggan,
+                    p.total_hutang AS saldo,
+                    COALESCE(h.total, 0) AS ledger
+                FROM pelanggan p
+                LEFT JOIN (
+                    SELECT id_pelanggan, SUM(sisa_hutang) AS total
+                    FROM hutang
+                    WHERE status = 1
+                    AND status_hutang = 'belum lunas'
+                    GROUP BY id_pelanggan
+                ) h ON h.id_pelanggan = p.id_pelanggan
+                WHERE p.total_hutang <> COALESCE(h.total, 0)
+                ORDER BY p.id_pelanggan
+            """)).mappings().fetchall()
+
+            selisih = [dict(row) for row in result]
+
+            if fix and selisih:
+                ids = [row["id_pelanggan"] for row in selisih]
+
+                # kunci saldo dulu: penulis hutang (adjust_total_hutang) menunggu di sini,
+                # deltanya diterapkan di atas hasil rekonsiliasi setelah commit
+                connection.execute(text("""
+                    SELECT id_pelanggan
+                    FROM pelanggan
+                    WHERE id_pelanggan = ANY(:ids)
+                    ORDER BY id_pelanggan
+                    FOR UPDATE
+                """), {"ids": ids})
+
+                # statement terpisah = snapshot baru (READ COMMITTED) setelah kunci didapat,
+                # jadi ledger yang sudah commit sebelum kunci ikut terhitung
+                connection.execute(text("""
+                    UPDATE pelanggan p
+                    SET total_hutang = COALESCE((
+                        SELECT SUM(h.sisa_hutang)
+                        FROM hutang h
+                        WHERE h.id_pelanggan = p.id_pelanggan
+                        AND h.status = 1
+                        AND h.status_hutang = 'belum lunas'
+                    ), 0)
+                    WHERE p.id_pelanggan = ANY(:ids)
+                """), {"ids": ids})
+            return selisih
+    except SQLAlchemyError as e:
+        print(f"Error: {e}")
+        return None
+
+def get_hutang_aging(id_lokasi=None, id_pelanggan=None, sort="desc", limit=None, cursor=None):
+    """
+    Umur hutang belum lunas per pelanggan & lokasi dalam bucket 0-30/31-60/61-90/90+ hari
+    (dari tanggal transaksi), diurutkan berdasarkan total. Keyset pagination pada
+    (total, id_pelanggan, id_lokasi); mengembalikan (data, next_cursor).
+    """
+    sort = (sort or "desc").lower()
+    if sort not in ("asc", "desc"):
+        raise ValueError("Parameter 'sort' harus asc atau desc.")
+    limit = max(1, min(limit or HUTANG_AGING_DEFAULT_LIMIT, HUTANG_AGING_MAX_LIMIT))
+
+    hari_ini = get_wita().date()
+    params = {
+        "batas_30": hari_ini - timedelta(days=30),
+        "batas_60": hari_ini - timedelta(days=60),
+        "batas_90": hari_ini - timedelta(days=90),
+        "hari_ini": hari_ini,
+        "limit": limit + 1,
+    }
+    conditions = ["h.status = 1", "h.status_hutang = 'belum lunas'"]
+    having = ""
+
+    if id_lokasi:
+        conditions.append("t.id_lokasi = :id_lokasi")
+        params["id_lokasi"] = id_lokasi
+
+    if id_pelanggan:
+        conditions.append("h.id_pelanggan = :id_pelanggan")
+        params["id_pelanggan"] = id_pelanggan
+
+    if cursor:
+        cursor_total, cursor_pelanggan, cursor_lokasi = decode_cursor(cursor, 3)
+        try:
+            params["cursor_total"] = Decimal(cursor_total)
+            params["cursor_pelanggan"] = int(cursor_pelanggan)
+            params["cursor_lokasi"] = int(cursor_lokasi)
+        except (InvalidOperation, ValueError):
+            raise ValueError("Cursor tidak valid.")
+        operator = "<" if sort == "desc" else ">"
+        having = f"""
+            HAVING (SUM(h.sisa_hutang), h.id_pelanggan, COALESCE(t.id_lokasi, 0))
+                {operator} (:cursor_total, :cursor_pelanggan, :cursor_lokasi)
+        """
+
+    # hutang tanpa transaksi memakai tanggal dibuatnya
+    tanggal = "COALESCE(t.tanggal, h.created_at)"
+    arah = sort.upper()
+    query = f"""
+        SELECT
+            h.id_pelanggan,
+            p.nama_pelanggan,
+            p.kontak,
+            COALESCE(t.id_lokasi, 0) AS id_lokasi,
+            l.nama_lokasi,
+            COALESCE(SUM(h.sisa_hutang) FILTER (WHERE {tanggal} >= :batas_30), 0) AS umur_0_30,
+            COALESCE(SUM(h.sisa_hutang) FILTER (WHERE {tanggal} < :batas_30 AND {tanggal} >= :batas_60), 0) AS umur_31_60,
+            COALESCE(SUM(h.sisa_hutang) FILTER (WHERE {tanggal} < :batas_60 AND {tanggal} >= :batas_90), 0) AS umur_61_90,
+            COALESCE(SUM(h.sisa_hutang) FILTER (WHERE {tanggal} < :batas_90), 0) AS umur_90_lebih,
+            SUM(h.sisa_hutang) AS total,
+            COUNT(*) AS jumlah_hutang,
+            :hari_ini - MIN({tanggal})::date AS umur_terlama
+        FROM hutang h
+        INNER JOIN pelanggan p ON h.id_pelanggan = p.id_pelanggan
+        LEFT JOIN transaksi t ON h.id_transaksi = t.id_transaksi
+        LEFT JOIN lokasi l ON t.id_lokasi = l.id_lokasi
+        WHERE {" AND ".join(conditions)}
+        GROUP BY h.id_pelanggan, p.nama_pelanggan, p.kontak, COALESCE(t.id_lokasi, 0), l.nama_lokasi
+        {having}
+        ORDER BY total {arah}, h.id_pelanggan {arah}, COALESCE(t.id_lokasi, 0) {arah}
+        LIMIT :limit
+    """
+
+    engine = get_read_connection()
+    try:
+        with engine.connect() as connection:
+            result = connection.execute(text(query), params).mappings().fetchall()
+            rows = [dict(row) for row in result]
+
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                next_cursor = encode_cursor(last["total"], last["id_pelanggan"], last["id_lokasi"])
+
+            return rows, next_cursor
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return [], None
+
 def bayar_hutang(id_pelanggan, jumlah_bayar):
+    # LEAST() mengabaikan NULL: tanpa validasi ini semua hutang ikut lunas
+    # (validasi format jumlah_bayar ada di resource)
+    if jumlah_bayar is None or jumlah_bayar <= 0:
+        return None
+
     timestamp_wita = get_wita()
     engine = get_connection()
     try:
         with engine.begin() as connection:
-            sisa_bayar = jumlah_bayar
+            # Alokasi FIFO dalam satu statement: hutang terlama dilunasi dulu.
+            # dibayar = min(sisa_hutang, jumlah_bayar - total sisa hutang sebelumnya)
             result = connection.execute(text("""
-                SELECT h.id_hutang, h.sisa_hutang, p.nama_pelanggan, p.kontak
-                FROM hutang h
-                INNER JOIN pelanggan p ON h.id_pelanggan = p.id_pelanggan   
-                WHERE h.id_pelanggan = :id_pelanggan
-                AND h.status = 1
-                AND h.status_hutang = 'belum lunas'
-                ORDER BY id_hutang ASC
-            """), {"id_pelanggan": id_pelanggan}).mappings().fetchall()
+                WITH terkunci AS (
+                    SELECT id_hutang, sisa_hutang
+                    FROM hutang
+                    WHERE id_pelanggan = :id_pelanggan
+                    AND status = 1
+                    AND status_hutang = 'belum lunas'
+                    ORDER BY id_hutang ASC
+                    FOR UPDATE
+                ),
+                alokasi AS (
+                    SELECT
+                        id_hutang,
+                        sisa_hutang,
+                        LEAST(
+                            sisa_hutang,
+                            :jumlah_bayar - (SUM(sisa_hutang) OVER (ORDER BY id_hutang) - sisa_hutang)
+                        ) AS dibayar
+                    FROM terkunci
+                ),
+                dibayar AS (
+                    UPDATE hutang h
+                    SET sisa_hutang = h.sisa_hutang - a.dibayar,
+                        status_hutang = CASE WHEN a.dibayar >= a.sisa_hutang THEN 'lunas' ELSE h.status_hutang END,
+                        updated_at = :timestamp_wita
+                    FROM alokasi a
+                    WHERE h.id_hutang = a.id_hutang
+                    AND a.dibayar > 0
+                    RETURNING h.id_hutang, a.dibayar, a.sisa_hutang
+                ),
+                saldo AS (
+                    UPDATE pelanggan
+                    SET total_hutang = total_hutang - (SELECT COALESCE(SUM(dibayar), 0) FROM dibayar)
+                    WHERE id_pelanggan = :id_pelanggan
+                )
+                SELECT
+                    d.id_hutang,
+                    p.nama_pelanggan,
+                    p.kontak,
+                    d.dibayar,
+                    CASE WHEN d.dibayar >= d.sisa_hutang THEN 'lunas' ELSE 'sebagian' END AS status
+                FROM dibayar d
+                INNER JOIN pelanggan p ON p.id_pelanggan = :id_pelanggan
+                ORDER BY d.id_hutang ASC
+            """), {
+                "id_pelanggan": id_pelanggan,
+                "jumlah_bayar": jumlah_bayar,
+                "timestamp_wita": timestamp_wita
+            }).mappings().fetchall()
 
             if not result:
                 return None
 
-            data = []
-
-            for row in result:
-                if sisa_bayar <= 0:
-                    break
-
-                id_hutang = row['id_hutang']
-                sisa_hutang = row['sisa_hutang']
-                nama_pelanggan = row['nama_pelanggan']
-                kontak = row['kontak']
-
-                if sisa_bayar >= sisa_hutang:
-                    # Lunas
-                    connection.execute(text("""
-                        UPDATE hutang
-                        SET sisa_hutang = 0, status_hutang = 'lunas', updated_at = :timestamp_wita
-                        WHERE id_hutang = :id_hutang
-                    """), {"id_hutang": id_hutang, "timestamp_wita": timestamp_wita})
-                    data.append({
-                        "id_hutang": id_hutang, "nama_pelanggan": nama_pelanggan, "kontak": kontak, 
-                        "dibayar": sisa_hutang, "status": "lunas"
-                        })
-                    sisa_bayar -= sisa_hutang
-                else:
-                    # Sebagian
-                    connection.execute(text("""
-                        UPDATE hutang
-                        SET sisa_hutang = sisa_hutang - :dibayar, updated_at = :timestamp_wita
-                        WHERE id_hutang = :id_hutang
-                    """), {"dibayar": sisa_bayar, "id_hutang": id_hutang, "timestamp_wita": timestamp_wita})
-                    data.append({
-                        "id_hutang": id_hutang, "nama_pelanggan": nama_pelanggan, "kontak": kontak, 
-                        "dibayar": sisa_bayar, "status": "sebagian"
-                        })
-                    sisa_bayar = 0
-            return data
+            bump_resource_version(connection, "hutang")
+            return [dict(row) for row in result]
     except SQLAlchemyError as e:
         print(f"Error: {e}")
         return None
@@ -0,0 +1,153 @@
+# api/query/q_idempotency.py
+
+import hashlib
+import json
+import threading
+from datetime import timedelta
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from ..utils.config import get_connection, get_wita
+
+
+# lama penyimpanan respons untuk replay
+IDEMPOTENCY_TTL = timedelta(hours=24)
+
+# interval pembersihan kunci kedaluwarsa (detik)
+IDEMPOTENCY_CLEANUP_INTERVAL = 3600
+
+
+# field pengiriman (bukan isi transaksi) yang tidak ikut di-hash, agar kunci
+# dari POST /transaksi/ tetap cocok saat dikirim ulang lewat /transaksi/batch
+NON_BUSINESS_FIELDS = ("waktu_transaksi", "idempotency_key")
+
+
+def hash_payload(payload):
+    business = {
+        k: v for k, v in payload.items()
+        if k not in NON_BUSINESS_FIELDS
+    }
+    return hashlib.sha256(
+        json.dumps(business, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+# =========================================================
+# KLAIM KUNCI
+# =========================================================
+
+def claim_idempotency_key(connection, scope, key, request_hash, timestamp_wita):
+    """
+    Mengklaim kunci (per scope/user) di dalam DB transaction pemanggil.
+    Mengembalikan None jika kunci baru atau sudah kedaluwarsa (lanjutkan
+    proses), atau respons tersimpan jika kunci sudah pernah diproses.
+    Request bersamaan dengan kunci yang sama akan menunggu sampai
+    transaksi pertama selesai.
+    """
+
+    # kunci kedaluwarsa yang belum dipurge diklaim ulang, bukan di-replay
+    claimed = connection.execute(text("""
+        INSERT INTO idempotency_key (
+            scope,
+            key,
+            request_hash,
+            created_at,
+            expires_at
+        )
+        VALUES (
+            :scope,
+            :key,
+            :request_hash,
+            :timestamp_wita,
+            :expires_at
+        )
+        ON CONFLICT (scope, key) DO UPDATE
+        SET request_hash = EXCLUDED.request_hash,
+            response = NULL,
+            created_at = EXCLUDED.created_at,
+            expires_at = EXCLUDED.expires_at
+        WHERE idempotency_key.expires_at < EXCLUDED.created_at
+        RETURNING key;
+    """), {
+        "scope": scope or "",
+        "key": key,
+        "request_hash": request_hash,
+        "timestamp_wita": timestamp_wita,
+        "expires_at": timestamp_wita + IDEMPOTENCY_TTL
+    }).fetchone()
+
+    if claimed:
+        return None
+
+    existing = connection.execute(text("""
+        SELECT request_hash, response
+        FROM idempotency_key
+        WHERE scope = :scope
+        AND key = :key;
+    """), {
+        "scope": scope or "",
+        "key": key
+    }).mappings().fetchone()
+
+    if existing["request_hash"] != request_hash:
+        raise ValueError(
+            "Idempotency-Key sudah dipakai untuk request yang berbeda."
+        )
+
+    return existing["response"]
+
+
+# =========================================================
+# SIMPAN RESPONS
+# =========================================================
+
+def save_idempotency_response(connection, scope, key, response):
+
+    connection.execute(text("""
+        UPDATE idempotency_key
+        SET response = CAST(:response AS JSONB)
+        WHERE scope = :scope
+        AND key = :key;
+    """), {
+        "scope": scope or "",
+        "key": key,
+        "response": json.dumps(response, default=str)
+    })
+
+
+# =========================================================
+# HAPUS KUNCI KEDALUWARSA
+# =========================================================
+
+def purge_expired_idempotency_keys():
+
+    engine = get_connection()
+
+    try:
+
+        with engine.begin() as connection:
+
+            result = connection.execute(text("""
+                DELETE FROM idempotency_key
+                WHERE expires_at < :timestamp_wita;
+            """), {
+                "timestamp_wita": get_wita()
+            })
+
+            return result.rowcount
+
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return None
+
+
+def start_idempotency_cleanup(interval=IDEMPOTENCY_CLEANUP_INTERVAL):
+    """Menjalankan purge_expired_idempotency_keys berkala di thread latar."""
+
+    def run():
+        purge_expired_idempotency_keys()
+        start_idempotency_cleanup(interval)
+
+    timer = threading.Timer(interval, run)
+    timer.daemon = True
+    timer.start()
+    return timer
@@ -1,188 +1,266 @@
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 from flask import logging
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
-from ..utils.config import get_connection, get_wita
+from ..utils.config import get_wita
+from ..utils.db_routing import get_read_connection
+from ..utils.helper import date_range_filter
 
 
-def get_all_laporan_transaksi(periode=None, start_date=None, end_date=None):
-    engine = get_connection()
-    try:
-        with engine.connect() as connection:
-            query = """
-                SELECT 
-                    t.id_transaksi, t.id_kasir, t.id_lokasi, t.id_pelanggan,
-                    t.tanggal, t.total, t.tunai, t.kembalian,
-                    COALESCE(h.sisa_hutang, 0) AS sisa_hutang,
-                    COALESCE(h.status_hutang, 'lunas') AS status_hutang
-                FROM transaksi t
-                LEFT JOIN hutang h ON t.id_transaksi = h.id_transaksi
-                WHERE t.status = 1
-            """
-            params = {}
+# jumlah baris yang diambil per fetch dari server-side cursor
+STREAM_BATCH_SIZE = 1000
 
-            # Tambahan filter berdasarkan periode
-            today = date.today()
-            if periode == "today":
-                query += " AND DATE(t.tanggal) = :today"
-                params["today"] = today
-            elif periode == "this_week":
-                start_of_week = today - timedelta(days=today.weekday())
-                end_of_week = start_of_week + timedelta(days=6)
-                query += " AND DATE(t.tanggal) BETWEEN :start_of_week AND :end_of_week"
-                params["start_of_week"] = start_of_week
-                params["end_of_week"] = end_of_week
-            elif periode == "this_month":
-                start_of_month = today.replace(day=1)
-                next_month = (start_of_month.replace(day=28) + timedelta(days=4)).replace(day=1)
-                end_of_month = next_month - timedelta(days=1)
-                query += " AND DATE(t.tanggal) BETWEEN :start_of_month AND :end_of_month"
-                params["start_of_month"] = start_of_month
-                params["end_of_month"] = end_of_month
-
-            # Filter berdasarkan rentang tanggal
-            if start_date and end_date:
-                try:
-                    start_date_parsed = datetime.strptime(start_date, "%Y-%m-%d").date()
-                    end_date_parsed = datetime.strptime(end_date, "%Y-%m-%d").date()
-                    query += " AND DATE(t.tanggal) BETWEEN :start_date AND :end_date"
-                    params["start_date"] = start_date_parsed
-                    params["end_date"] = end_date_parsed
-                except ValueError:
-                    pass  # Jika format tidak valid, abaikan saja filter ini
-
-            query += " ORDER BY t.tanggal DESC"
 
-            result = connection.execute(text(query), params).mappings().fetchall()
+def _stream_rows(query, params):
+    """Menghasilkan baris satu per satu memakai server-side cursor."""
+    engine = get_read_connection()
+    with engine.connect() as connection:
+        result = connection.execution_options(
+            stream_results=True,
+            yield_per=STREAM_BATCH_SIZE
+        ).execute(text(query), params).mappings()
+        for row in result:
+            yield dict(row)
+
 
-            data = []
-            for row in result:
-                row_dict = dict(row)
+def _get_periode_range(periode):
+    today = date.today()
+    if periode == "today":
+        return today, today
+    elif periode == "this_week":
+        start_of_week = today - timedelta(days=today.weekday())
+        return start_of_week, start_of_week + timedelta(days=6)
+    elif periode == "this_month":
+        start_of_month = today.replace(day=1)
+        next_month = (start_of_month.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return start_of_month, next_month - timedelta(days=1)
+    return None
 
-                if isinstance(row_dict["tanggal"], (date, datetime)):
-                    row_dict["tanggal"] = row_dict["tanggal"].isoformat()
 
-                id_transaksi = row_dict["id_transaksi"]
+def _filter_periode(column, periode=None, start_date=None, end_date=None):
+    """Kondisi rentang tanggal dari periode dan/atau start_date-end_date."""
+    conditions = []
+    params = {}
 
-                # Hitung modal = SUM(qty × harga_beli) dari detailtransaksi
-                modal_result = connection.execute(text("""
-                    SELECT 
-                        SUM(dt.qty * pr.harga_beli) AS total_modal
-                    FROM detailtransaksi dt
-                    INNER JOIN produk pr ON dt.id_produk = pr.id_produk
-                    WHERE dt.id_transaksi = :id_transaksi AND dt.status = 1;
-                """), {"id_transaksi": id_transaksi}).scalar()
+    # Tambahan filter berdasarkan periode
+    periode_range = _get_periode_range(periode)
+    if periode_range:
+        clause, range_params = date_range_filter(column, *periode_range, name="periode")
+        conditions.append(clause)
+        params.update(range_params)
 
-                modal = modal_result if modal_result else 0
-                keuntungan = row_dict["total"] - modal
+    # Filter berdasarkan rentang tanggal
+    if start_date and end_date:
+        try:
+            clause, range_params = date_range_filter(column, start_date, end_date)
+            conditions.append(clause)
+            params.update(range_params)
+        except ValueError:
+            pass  # Jika format tidak valid, abaikan saja filter ini
 
-                row_dict["modal"] = modal
-                row_dict["keuntungan"] = keuntungan
+    return conditions, params
 
-                data.append(row_dict)
-            return data
+
+def _build_laporan_transaksi_query(periode=None, start_date=None, end_date=None):
+    query = """
+        SELECT 
+            t.id_transaksi, t.id_kasir, t.id_lokasi, t.id_pelanggan,
+            t.tanggal, t.total, t.tunai, t.kembalian,
+            COALESCE(h.sisa_hutang, 0) AS sisa_hutang,
+            COALESCE(h.status_hutang, 'lunas') AS status_hutang
+        FROM transaksi t
+        LEFT JOIN hutang h ON t.id_transaksi = h.id_transaksi
+        WHERE t.status = 1
+    """
+    params = {}
+
+    conditions, filter_params = _filter_periode("t.tanggal", periode, start_date, end_date)
+    for clause in conditions:
+        query += f" AND {clause}"
+    params.update(filter_params)
+
+    # Modal = SUM(qty × harga_beli) dihitung sekali untuk semua transaksi terfilter
+    query = f"""
+        WITH trx AS ({query}),
+        modal_trx AS (
+            SELECT 
+                dt.id_transaksi,
+                SUM(dt.qty * pr.harga_beli) AS total_modal
+            FROM detailtransaksi dt
+            INNER JOIN trx ON dt.id_transaksi = trx.id_transaksi
+            INNER JOIN produk pr ON dt.id_produk = pr.id_produk
+            WHERE dt.status = 1
+            GROUP BY dt.id_transaksi
+        )
+        SELECT 
+            trx.*,
+            COALESCE(m.total_modal, 0) AS modal,
+            trx.total - COALESCE(m.total_modal, 0) AS keuntungan
+        FROM trx
+        LEFT JOIN modal_trx m ON trx.id_transaksi = m.id_transaksi
+        ORDER BY trx.tanggal DESC
+    """
+    return query, params
+
+
+def fetch_laporan_transaksi(connection, periode=None, start_date=None, end_date=None):
+    """Seperti get_all_laporan_transaksi, tetapi error DB diteruskan (untuk job laporan)."""
+    query, params = _build_laporan_transaksi_query(periode, start_date, end_date)
+    result = connection.execute(text(query), params).mappings().fetchall()
+    return [dict(row) for row in result]
+
+
+def get_all_laporan_transaksi(periode=None, start_date=None, end_date=None):
+    engine = get_read_connection()
+    try:
+        with engine.connect() as connection:
+            return fetch_laporan_transaksi(connection, periode, start_date, end_date)
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return []
+
+def iter_laporan_transaksi(periode=None, start_date=None, end_date=None):
+    """Versi streaming get_all_laporan_transaksi (server-side cursor) untuk ekspor."""
+    query, params = _build_laporan_transaksi_query(periode, start_date, end_date)
+    return _stream_rows(query, params)
     
-def get_laporan_penjualan_item_grouped(id_produk=None, id_lokasi=None, start_date=None, end_date=None):
-    engine = get_connection()
+def get_ringkasan_laporan_transaksi(periode=None, start_date=None, end_date=None):
+    """Total penjualan, modal, dan keuntungan periode laporan dari rollup penjualan_harian."""
+    engine = get_read_connection()
     try:
         with engine.connect() as connection:
-            query = """
-                SELECT 
-                    dt.id_produk,
-                    pr.nama_produk,
-                    pr.satuan,
-                    SUM(dt.qty) AS total_qty,
-                    pr.harga_beli,
-                    dt.harga_jual,
-                    SUM(dt.qty * dt.harga_jual) AS subtotal,
-                    SUM(dt.qty * pr.harga_beli) AS modal,
-                    SUM((dt.qty * dt.harga_jual) - (dt.qty * pr.harga_beli)) AS keuntungan
-                FROM detailtransaksi dt
-                INNER JOIN produk pr ON dt.id_produk = pr.id_produk
-                INNER JOIN transaksi t ON dt.id_transaksi = t.id_transaksi
-                WHERE dt.status = 1 AND t.status = 1
-            """
-            params = {}
+            conditions, params = _filter_periode("ph.tanggal", periode, start_date, end_date)
+            where_clause = " AND ".join(conditions) if conditions else "TRUE"
 
-            if id_produk:
-                query += " AND dt.id_produk = :id_produk"
-                params["id_produk"] = id_produk
-            if id_lokasi:
-                query += " AND t.id_lokasi = :id_lokasi"
-                params["id_lokasi"] = id_lokasi
-            if start_date and end_date:
-                query += " AND DATE(t.tanggal) BETWEEN :start_date AND :end_date"
-                params["start_date"] = start_date
-                params["end_date"] = end_date
-
-            query += """
-                GROUP BY dt.id_produk, pr.nama_produk, pr.satuan, pr.harga_beli, dt.harga_jual
-                ORDER BY pr.nama_produk ASC
-            """
-            result = connection.execute(text(query), params).mappings().fetchall()
-            return [dict(row) for row in result]
+            result = connection.execute(text(f"""
+                SELECT 
+                    CAST(COALESCE(SUM(ph.qty), 0) AS BIGINT) AS total_qty,
+                    CAST(COALESCE(SUM(ph.subtotal), 0) AS BIGINT) AS subtotal,
+                    CAST(COALESCE(SUM(ph.modal), 0) AS BIGINT) AS modal,
+                    CAST(COALESCE(SUM(ph.keuntungan), 0) AS BIGINT) AS keuntungan
+                FROM penjualan_harian ph
+                WHERE {where_clause}
+            """), params).mappings().fetchone()
+            return dict(result)
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
-        return []
+        return None
 
-def get_laporan_stok(id_produk=None, id_lokasi=None, start_date=None, end_date=None):
-    engine = get_connection()
+def _build_penjualan_item_query(id_produk=None, id_lokasi=None, start_date=None, end_date=None):
+    # Rentang laporan selalu berupa hari penuh (YYYY-MM-DD), jadi cukup dibaca dari rollup harian
+    query = """
+        SELECT 
+            ph.id_produk,
+            pr.nama_produk,
+            pr.satuan,
+            CAST(SUM(ph.qty) AS BIGINT) AS total_qty,
+            pr.harga_beli,
+            ph.harga_jual,
+            CAST(SUM(ph.subtotal) AS BIGINT) AS subtotal,
+            CAST(SUM(ph.modal) AS BIGINT) AS modal,
+            CAST(SUM(ph.keuntungan) AS BIGINT) AS keuntungan
+        FROM penjualan_harian ph
+        INNER JOIN produk pr ON ph.id_produk = pr.id_produk
+        WHERE TRUE
+    """
+    params = {}
+
+    if id_produk:
+        query += " AND ph.id_produk = :id_produk"
+        params["id_produk"] = id_produk
+    if id_lokasi:
+        query += " AND ph.id_lokasi = :id_lokasi"
+        params["id_lokasi"] = id_lokasi
+    if start_date and end_date:
+        clause, range_params = date_range_filter("ph.tanggal", start_date, end_date)
+        query += f" AND {clause}"
+        params.update(range_params)
+
+    query += """
+        GROUP BY ph.id_produk, pr.nama_produk, pr.satuan, pr.harga_beli, ph.harga_jual
+        ORDER BY pr.nama_produk ASC
+    """
+    return query, params
+
+
+def fetch_laporan_penjualan_item(connection, id_produk=None, id_lokasi=None, start_date=None, end_date=None):
+    """Seperti get_laporan_penjualan_item_grouped, tetapi error DB diteruskan (untuk job laporan)."""
+    query, params = _build_penjualan_item_query(id_produk, id_lokasi, start_date, end_date)
+    result = connection.execute(text(query), params).mappings().fetchall()
+    return [dict(row) for row in result]
+
+
+def get_laporan_penjualan_item_grouped(id_produk=None, id_lokasi=None, start_date=None, end_date=None):
+    engine = get_read_connection()
     try:
         with engine.connect() as connection:
-            query = """
-                SELECT 
-                    s.id_lokasi,
-                    l.nama_lokasi,
-                    s.id_produk,
-                    p.nama_produk,
-                    p.satuan,
-                    p.harga_beli,
-                    p.harga_jual,
-                    p.expired_date,
-                    p.stok_optimal,
-                    s.jumlah AS sisa_stok,
-                    (s.jumlah * p.harga_beli) AS nilai_modal,
-                    (s.jumlah * (p.harga_jual - p.harga_beli)) AS potensi_keuntungan
-                FROM stok s
-                INNER JOIN produk p ON s.id_produk = p.id_produk
-                INNER JOIN lokasi l ON s.id_lokasi = l.id_lokasi
-                WHERE s.status = 1 AND p.status = 1 AND l.status = 1
-            """
-            params = {}
+            return fetch_laporan_penjualan_item(connection, id_produk, id_lokasi, start_date, end_date)
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return []
 
-            if id_produk:
-                query += " AND s.id_produk = :id_produk"
-                params["id_produk"] = id_produk
-            if id_lokasi:
-                query += " AND s.id_lokasi = :id_lokasi"
-                params["id_lokasi"] = id_lokasi
-            if start_date and end_date:
-                query += " AND DATE(s.updated_at) BETWEEN :start_date AND :end_date"
-                params["start_date"] = start_date
-                params["end_date"] = end_date
+def iter_laporan_penjualan_item(id_produk=None, id_lokasi=None, start_date=None, end_date=None):
+    """Versi streaming get_laporan_penjualan_item_grouped untuk ekspor."""
+    query, params = _build_penjualan_item_query(id_produk, id_lokasi, start_date, end_date)
+    return _stream_rows(query, params)
 
-            query += " ORDER BY s.id_lokasi, s.id_produk"
 
-            result = connection.execute(text(query), params).mappings().fetchall()
+def _build_laporan_stok_query(id_produk=None, id_lokasi=None, start_date=None, end_date=None):
+    query = """
+        SELECT 
+            s.id_lokasi,
+            l.nama_lokasi,
+            s.id_produk,
+            p.nama_produk,
+            p.satuan,
+            p.harga_beli,
+            p.harga_jual,
+            p.expired_date,
+            p.stok_optimal,
+            s.jumlah AS sisa_stok,
+            (s.jumlah * p.harga_beli) AS nilai_modal,
+            (s.jumlah * (p.harga_jual - p.harga_beli)) AS potensi_keuntungan
+        FROM stok s
+        INNER JOIN produk p ON s.id_produk = p.id_produk
+        INNER JOIN lokasi l ON s.id_lokasi = l.id_lokasi
+        WHERE s.status = 1 AND p.status = 1 AND l.status = 1
+    """
+    params = {}
+
+    if id_produk:
+        query += " AND s.id_produk = :id_produk"
+        params["id_produk"] = id_produk
+    if id_lokasi:
+        query += " AND s.id_lokasi = :id_lokasi"
+        params["id_lokasi"] = id_lokasi
+    if start_date and end_date:
+        clause, range_params = date_range_filter("s.updated_at", start_date, end_date)
+        query += f" AND {clause}"
+        params.update(range_params)
+
+    query += " ORDER BY s.id_lokasi, s.id_produk"
+    return query, params
+
 
-            laporan = []
-            for row in result:
-                data = dict(row)
-                if data["expired_date"]:
-                    data["expired_date"] = data["expired_date"].isoformat()
-                laporan.append(data)
+def fetch_laporan_stok(connection, id_produk=None, id_lokasi=None, start_date=None, end_date=None):
+    """Seperti get_laporan_stok, tetapi error DB diteruskan (untuk job laporan)."""
+    query, params = _build_laporan_stok_query(id_produk, id_lokasi, start_date, end_date)
+    result = connection.execute(text(query), params).mappings().fetchall()
+    return [dict(row) for row in result]
 
-            return laporan
+
+def get_laporan_stok(id_produk=None, id_lokasi=None, start_date=None, end_date=None):
+    engine = get_read_connection()
+    try:
+        with engine.connect() as connection:
+            return fetch_laporan_stok(connection, id_produk, id_lokasi, start_date, end_date)
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return []
 
 """#=== Filter function ===#"""
 def get_produk_yang_terjual(id_lokasi=None):
-    engine = get_connection()
+    engine = get_read_connection()
     try:
         with engine.connect() as connection:
             query = """
@@ -208,7 +286,7 @@ def get_produk_yang_terjual(id_lokasi=None):
         return []
 
 def get_produk_dengan_stok(id_lokasi=None):
-    engine = get_connection()
+    engine = get_read_connection()
     try:
         with engine.connect() as connection:
             query = """
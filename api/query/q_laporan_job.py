@@ -0,0 +1,301 @@
+# api/query/q_laporan_job.py
+
+import hashlib
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from ..utils.config import get_connection, get_wita, set_long_statement_timeout
+from ..utils.helper import json_default
+from ..utils.resource_version import get_resource_versions
+from .q_laporan import (
+    _get_periode_range,
+    fetch_laporan_penjualan_item,
+    fetch_laporan_stok,
+    fetch_laporan_transaksi
+)
+
+
+# jenis laporan -> (fungsi, parameter yang diterima)
+# fungsi fetch_* meneruskan error DB agar job ditandai 'failed', bukan 'done' dengan hasil kosong
+LAPORAN_JOB_JENIS = {
+    "transaksi": (
+        fetch_laporan_transaksi,
+        ("periode", "start_date", "end_date")
+    ),
+    "penjualan-item": (
+        fetch_laporan_penjualan_item,
+        ("id_produk", "id_lokasi", "start_date", "end_date")
+    ),
+    "stok": (
+        fetch_laporan_stok,
+        ("id_produk", "id_lokasi")
+    ),
+}
+
+# resource_version yang ikut menentukan hasil tiap jenis laporan
+LAPORAN_JOB_RESOURCE = {
+    "transaksi": ("hutang", "produk"),
+    "penjualan-item": ("penjualan_harian", "produk"),
+    "stok": ("stok", "produk", "lokasi"),
+}
+
+# job lama dihapus setelah batas ini
+LAPORAN_JOB_RETENTION = timedelta(days=1)
+
+# job pending/running lebih lama dari ini dianggap macet (worker mati)
+LAPORAN_JOB_TIMEOUT = timedelta(minutes=15)
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("LAPORAN_JOB_WORKERS", "2")),
+    thread_name_prefix="laporan-job"
+)
+
+
+# =========================================================
+# VERSI DATA (PENANDA HASIL BASI)
+# =========================================================
+
+def _get_versi_data(connection, jenis):
+    """
+    Penanda versi data sumber laporan, mis. "120.4.17".
+    Transaksi hanya bertambah (tidak pernah diubah/dihapus), jadi MAX(id_transaksi)
+    mencakup checkout (penjualan, hutang & potong stok) tanpa counter yang diperebutkan
+    setiap checkout; penulis lain menaikkan counter resource_version.
+    """
+
+    versi = [connection.execute(text("""
+        SELECT COALESCE(MAX(id_transaksi), 0) FROM transaksi;
+    """)).scalar()]
+
+    counter = get_resource_versions(connection, *LAPORAN_JOB_RESOURCE[jenis])
+    versi.extend(counter[resource] for resource in LAPORAN_JOB_RESOURCE[jenis])
+
+    return ".".join(str(v) for v in versi)
+
+
+# =========================================================
+# BUAT / PAKAI ULANG JOB
+# =========================================================
+
+def _resolve_periode(params):
+    """
+    periode relatif (today/this_week/this_month) diganti tanggal absolut saat job
+    dibuat, agar hash cache & eksekusi job tidak bergeser ke hari lain.
+    """
+    periode_range = _get_periode_range(params.pop("periode", None))
+    if not periode_range:
+        return params
+
+    start, end = periode_range
+    if params.get("start_date") and params.get("end_date"):
+        # periode dan rentang tanggal sama-sama berlaku (irisan), lihat _filter_periode
+        try:
+            start = max(start, date.fromisoformat(params["start_date"]))
+            end = min(end, date.fromisoformat(params["end_date"]))
+        except ValueError:
+            pass  # rentang tidak valid diabaikan, sama seperti laporan sinkron
+
+    params["start_date"] = start.isoformat()
+    params["end_date"] = end.isoformat()
+    return params
+
+
+def create_laporan_job(jenis, params):
+
+    if jenis not in LAPORAN_JOB_JENIS:
+        raise ValueError(
+            f"Jenis laporan tidak dikenal. Pilihan: {', '.join(LAPORAN_JOB_JENIS)}"
+        )
+
+    _, allowed = LAPORAN_JOB_JENIS[jenis]
+    params = {
+        key: params[key]
+        for key in allowed
+        if params.get(key) not in (None, "")
+    }
+    params = _resolve_periode(params)
+    params_hash = hashlib.sha256(
+        json.dumps([jenis, params], sort_keys=True).encode()
+    ).hexdigest()
+
+    timestamp_wita = get_wita()
+
+    engine = get_connection()
+
+    try:
+
+        with engine.begin() as connection:
+
+            versi_data = _get_versi_data(connection, jenis)
+
+            # hasil selesai/berjalan dengan parameter & versi data sama dipakai ulang
+            existing = connection.execute(text("""
+                SELECT id_job, status
+                FROM laporan_job
+                WHERE params_hash = :params_hash
+                AND versi_data = :versi_data
+                AND (
+                    status = 'done'
+                    OR (
+                        status IN ('pending', 'running')
+                        AND created_at > :batas_berjalan
+                    )
+                )
+                ORDER BY created_at DESC
+                LIMIT 1;
+            """), {
+                "params_hash": params_hash,
+                "versi_data": versi_data,
+                "batas_berjalan": timestamp_wita - LAPORAN_JOB_TIMEOUT
+            }).mappings().fetchone()
+
+            if existing:
+                return dict(existing)
+
+            connection.execute(text("""
+                DELETE FROM laporan_job
+                WHERE created_at < :batas;
+            """), {
+                "batas": timestamp_wita - LAPORAN_JOB_RETENTION
+            })
+
+            id_job = uuid.uuid4().hex
+
+            connection.execute(text("""
+                INSERT INTO laporan_job (
+                    id_job,
+                    jenis,
+                    params,
+                    params_hash,
+                    versi_data,
+                    status,
+                    created_at
+                )
+                VALUES (
+                    :id_job,
+                    :jenis,
+                    CAST(:params AS JSONB),
+                    :params_hash,
+                    :versi_data,
+                    'pending',
+                    :timestamp_wita
+                );
+            """), {
+                "id_job": id_job,
+                "jenis": jenis,
+                "params": json.dumps(params),
+                "params_hash": params_hash,
+                "versi_data": versi_data,
+                "timestamp_wita": timestamp_wita
+            })
+
+        _executor.submit(_run_laporan_job, id_job, jenis, params)
+
+        return {
+            "id_job": id_job,
+            "status": "pending"
+        }
+
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return None
+
+
+# =========================================================
+# EKSEKUSI JOB (THREAD POOL)
+# =========================================================
+
+def _set_job_status(id_job, status, result=None, error=None):
+
+    engine = get_connection()
+
+    with engine.begin() as connection:
+
+        connection.execute(text("""
+            UPDATE laporan_job
+            SET
+                status = :status,
+                result = CAST(:result AS JSONB),
+                error = :error,
+                finished_at = CASE
+                    WHEN :status IN ('done', 'failed') THEN :timestamp_wita
+                    ELSE finished_at
+                END
+            WHERE id_job = :id_job;
+        """), {
+            "id_job": id_job,
+            "status": status,
+            "result": (
+                json.dumps(result, default=json_default)
+                if result is not None
+                else None
+            ),
+            "error": error,
+            "timestamp_wita": get_wita()
+        })
+
+
+def _run_laporan_job(id_job, jenis, params):
+
+    fungsi, _ = LAPORAN_JOB_JENIS[jenis]
+
+    try:
+
+        _set_job_status(id_job, "running")
+
+        # dibaca dari primary: hasil disimpan dengan versi_data milik primary,
+        # replika yang tertinggal akan menyimpan hasil lama sebagai versi baru
+        # tidak dibatasi statement_timeout request; pakai DB_LONG_STATEMENT_TIMEOUT_MS
+        with get_connection().connect() as connection:
+            set_long_statement_timeout(connection)
+            result = fungsi(connection, **params)
+
+        _set_job_status(id_job, "done", result=result)
+
+    except Exception as e:
+
+        print(f"Error laporan job {id_job}: {str(e)}")
+
+        try:
+            _set_job_status(id_job, "failed", error=str(e))
+        except SQLAlchemyError as db_error:
+            print(f"Error occurred: {str(db_error)}")
+
+
+# =========================================================
+# STATUS JOB
+# =========================================================
+
+def get_laporan_job(id_job):
+
+    engine = get_connection()
+
+    try:
+
+        with engine.connect() as connection:
+
+            result = connection.execute(text("""
+                SELECT
+                    id_job,
+                    jenis,
+                    params,
+                    status,
+                    result,
+                    error,
+                    created_at,
+                    finished_at
+                FROM laporan_job
+                WHERE id_job = :id_job;
+            """), {
+                "id_job": id_job
+            }).mappings().fetchone()
+
+            return dict(result) if result else None
+
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return None
@@ -1,6 +1,7 @@
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 from ..utils.config import get_connection, get_wita
+from ..utils.resource_version import bump_resource_version
 
 
 def get_all_lokasi():
@@ -26,6 +27,7 @@ def insert_lokasi(data):
                 VALUES (:nama_lokasi, :tipe, 1)
                 RETURNING nama_lokasi
             """), data).mappings().fetchone()
+            bump_resource_version(connection, "lokasi")
             return dict(result)
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
@@ -59,6 +61,8 @@ def update_lokasi(id_lokasi, data):
                     ),
                 {**data, "id_lokasi": id_lokasi, "timestamp_wita": timestamp_wita}
             ).fetchone()
+            if result:
+                bump_resource_version(connection, "lokasi")
             return result
     except SQLAlchemyError as e:
         print(f"Error: {e}")
@@ -73,6 +77,8 @@ def delete_lokasi(id_lokasi):
                 text("UPDATE lokasi SET status = 0, updated_at = :timestamp_wita WHERE status = 1 AND id_lokasi = :id_lokasi RETURNING nama_lokasi;"),
                 {"id_lokasi": id_lokasi, "timestamp_wita": timestamp_wita}
             ).fetchone()
+            if result:
+                bump_resource_version(connection, "lokasi")
             return result
     except SQLAlchemyError as e:
         print(f"Error: {e}")
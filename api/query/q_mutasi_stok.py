@@ -1,7 +1,8 @@
-from datetime import date, datetime
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 from ..utils.config import get_connection, get_wita
+from ..utils.helper import date_range_filter
+from ..utils.resource_version import bump_resource_version
 
 
 def get_all_mutasi_stok(filters={}):
@@ -24,9 +25,11 @@ def get_all_mutasi_stok(filters={}):
                 params["id_lokasi_tujuan"] = filters["id_lokasi_tujuan"]
 
             if filters.get("tanggal_awal") and filters.get("tanggal_akhir"):
-                conditions.append("m.tanggal BETWEEN :tanggal_awal AND :tanggal_akhir")
-                params["tanggal_awal"] = filters["tanggal_awal"]
-                params["tanggal_akhir"] = filters["tanggal_akhir"]
+                clause, range_params = date_range_filter(
+                    "m.tanggal", filters["tanggal_awal"], filters["tanggal_akhir"]
+                )
+                conditions.append(clause)
+                params.update(range_params)
 
             query = f"""
                 SELECT 
@@ -49,15 +52,7 @@ def get_all_mutasi_stok(filters={}):
             """
 
             result = connection.execute(text(query), params).mappings().fetchall()
-
-            data = []
-            for row in result:
-                row_dict = dict(row)
-                # Convert date to string
-                if isinstance(row_dict["tanggal"], (date, datetime)):
-                    row_dict["tanggal"] = row_dict["tanggal"].isoformat()
-                data.append(row_dict)
-            return data
+            return [dict(row) for row in result]
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return []
@@ -126,6 +121,8 @@ def insert_mutasi_stok(data):
                     "updated_at": timestamp_wita
                 })
 
+            bump_resource_version(connection, "stok")
+
             # 4. Insert mutasi stok
             result = connection.execute(text("""
                 INSERT INTO mutasistok (
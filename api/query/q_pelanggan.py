@@ -2,8 +2,10 @@
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 
-from ..utils.helper import serialize_datetime
+from ..utils.helper import search_params, serialize_datetime
 from ..utils.config import get_connection, get_wita
+from ..utils.db_routing import get_read_connection
+from ..utils.resource_version import bump_resource_version
 
 
 # =========================================================
@@ -12,7 +14,7 @@ from ..utils.config import get_connection, get_wita
 
 def get_all_pelanggan():
 
-    engine = get_connection()
+    engine = get_read_connection()
 
     try:
 
@@ -37,6 +39,44 @@ def get_all_pelanggan():
         return []
 
 
+# =========================================================
+# SEARCH PELANGGAN (TYPEAHEAD)
+# =========================================================
+
+def search_pelanggan(q, limit=None):
+
+    params = search_params(q, limit)
+    engine = get_read_connection()
+
+    try:
+
+        with engine.connect() as connection:
+
+            # cocok nama/kontak via index trigram; prefix lalu kemiripan nama di atas
+            result = connection.execute(text("""
+                SELECT
+                    id_pelanggan,
+                    nama_pelanggan,
+                    kontak,
+                    alamat,
+                    poin
+                FROM pelanggan
+                WHERE status = 1
+                AND (nama_pelanggan ILIKE :pola OR kontak ILIKE :pola)
+                ORDER BY
+                    (nama_pelanggan ILIKE :prefix OR kontak ILIKE :prefix) DESC,
+                    similarity(nama_pelanggan, :q) DESC,
+                    nama_pelanggan
+                LIMIT :limit;
+            """), params).mappings().fetchall()
+
+            return [dict(row) for row in result]
+
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return []
+
+
 # =========================================================
 # INSERT PELANGGAN
 # =========================================================
@@ -250,7 +290,7 @@ def get_poin_pelanggan(id_pelanggan):
 
 def get_histori_poin_pelanggan(id_pelanggan):
 
-    engine = get_connection()
+    engine = get_read_connection()
 
     try:
 
@@ -418,6 +458,7 @@ def redeem_poin(id_pelanggan, payload):
                 "id_stok": stok["id_stok"],
                 "timestamp_wita": timestamp_wita
             })
+            bump_resource_version(connection, "stok")
 
             # =========================================================
             # INSERT HISTORI POIN
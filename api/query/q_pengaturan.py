@@ -6,6 +6,14 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from ..utils.config import get_connection, get_wita
 
+from ..utils.resource_version import bump_resource_version
+
+from ..utils.pengaturan_cache import (
+    get_pengaturan,
+    notify_pengaturan_changed,
+    refresh_pengaturan
+)
+
 
 # =========================================================
 # GET PENGATURAN POIN
@@ -13,33 +21,22 @@ from ..utils.config import get_connection, get_wita
 
 def get_pengaturan_poin():
 
+    # dibaca dari DB, bukan cache worker (bisa tertinggal NOTIFY/TTL), agar body
+    # cocok dengan ETag resource_version; cache worker ini ikut diperbarui
     engine = get_connection()
 
-    try:
-
-        with engine.connect() as connection:
-
-            result = connection.execute(text("""
-                SELECT
-                    key,
-                    value
-                FROM pengaturan
-                WHERE key = 'poin_kelipatan';
-            """)).mappings().fetchone()
-
-            if not result:
-                return None
+    with engine.connect() as connection:
+        refresh_pengaturan(connection)
 
-            return {
-                "poin_kelipatan": int(result["value"])
-            }
-
-    except SQLAlchemyError as e:
-
-        print(f"Error occurred: {str(e)}")
+    value = get_pengaturan("poin_kelipatan")
 
+    if value is None:
         return None
 
+    return {
+        "poin_kelipatan": int(value)
+    }
+
 
 # =========================================================
 # UPDATE PENGATURAN POIN
@@ -74,10 +71,16 @@ def update_pengaturan_poin(payload):
                 "value": str(poin_kelipatan)
             })
 
-            return {
-                "poin_kelipatan": poin_kelipatan,
-                "updated_at": str(timestamp_wita)
-            }
+            notify_pengaturan_changed(connection, "poin_kelipatan")
+            bump_resource_version(connection, "pengaturan")
+
+        # worker ini langsung memakai nilai baru
+        refresh_pengaturan()
+
+        return {
+            "poin_kelipatan": poin_kelipatan,
+            "updated_at": str(timestamp_wita)
+        }
 
     except ValueError as ve:
         raise ve
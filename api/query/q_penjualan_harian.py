@@ -0,0 +1,125 @@
+# api/query/q_penjualan_harian.py
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from ..utils.config import get_connection, get_wita, set_long_statement_timeout
+from ..utils.resource_version import bump_resource_version
+
+
+# =========================================================
+# UPDATE ROLLUP DARI SATU TRANSAKSI
+# =========================================================
+
+def upsert_penjualan_harian(connection, id_transaksi, id_lokasi, tanggal, timestamp_wita):
+    """
+    Menambahkan detail satu transaksi ke rollup penjualan_harian.
+    Dipanggil di dalam DB transaction yang sama dengan insert_transaksi.
+    """
+
+    connection.execute(text("""
+        INSERT INTO penjualan_harian (
+            tanggal,
+            id_lokasi,
+            id_produk,
+            harga_jual,
+            qty,
+            subtotal,
+            modal,
+            keuntungan,
+            updated_at
+        )
+        SELECT
+            :tanggal,
+            :id_lokasi,
+            dt.id_produk,
+            dt.harga_jual,
+            SUM(dt.qty),
+            SUM(dt.qty * dt.harga_jual),
+            SUM(dt.qty * COALESCE(pr.harga_beli, 0)),
+            SUM((dt.qty * dt.harga_jual) - (dt.qty * COALESCE(pr.harga_beli, 0))),
+            :timestamp_wita
+        FROM detailtransaksi dt
+        INNER JOIN produk pr
+            ON dt.id_produk = pr.id_produk
+        WHERE dt.id_transaksi = :id_transaksi
+        AND dt.status = 1
+        GROUP BY dt.id_produk, dt.harga_jual
+        ON CONFLICT (tanggal, id_lokasi, id_produk, harga_jual)
+        DO UPDATE SET
+            qty = penjualan_harian.qty + EXCLUDED.qty,
+            subtotal = penjualan_harian.subtotal + EXCLUDED.subtotal,
+            modal = penjualan_harian.modal + EXCLUDED.modal,
+            keuntungan = penjualan_harian.keuntungan + EXCLUDED.keuntungan,
+            updated_at = EXCLUDED.updated_at;
+    """), {
+        "id_transaksi": id_transaksi,
+        "id_lokasi": id_lokasi,
+        "tanggal": tanggal,
+        "timestamp_wita": timestamp_wita
+    })
+
+
+# =========================================================
+# REBUILD ROLLUP DARI HISTORI
+# =========================================================
+
+def rebuild_penjualan_harian():
+    """
+    Mengisi ulang seluruh penjualan_harian dari detailtransaksi.
+    Modal dihitung dari harga_beli produk saat ini.
+    """
+
+    timestamp_wita = get_wita()
+
+    engine = get_connection()
+
+    try:
+
+        with engine.begin() as connection:
+
+            set_long_statement_timeout(connection)
+
+            connection.execute(text("TRUNCATE penjualan_harian;"))
+
+            result = connection.execute(text("""
+                INSERT INTO penjualan_harian (
+                    tanggal,
+                    id_lokasi,
+                    id_produk,
+                    harga_jual,
+                    qty,
+                    subtotal,
+                    modal,
+                    keuntungan,
+                    updated_at
+                )
+                SELECT
+                    DATE(t.tanggal),
+                    t.id_lokasi,
+                    dt.id_produk,
+                    dt.harga_jual,
+                    SUM(dt.qty),
+                    SUM(dt.qty * dt.harga_jual),
+                    SUM(dt.qty * COALESCE(pr.harga_beli, 0)),
+                    SUM((dt.qty * dt.harga_jual) - (dt.qty * COALESCE(pr.harga_beli, 0))),
+                    :timestamp_wita
+                FROM detailtransaksi dt
+                INNER JOIN transaksi t
+                    ON dt.id_transaksi = t.id_transaksi
+                INNER JOIN produk pr
+                    ON dt.id_produk = pr.id_produk
+                WHERE dt.status = 1
+                AND t.status = 1
+                GROUP BY DATE(t.tanggal), t.id_lokasi, dt.id_produk, dt.harga_jual;
+            """), {
+                "timestamp_wita": timestamp_wita
+            })
+
+            # hasil job laporan penjualan-item sebelum rebuild jadi basi
+            bump_resource_version(connection, "penjualan_harian")
+
+            return result.rowcount
+
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return None
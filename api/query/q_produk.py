@@ -1,26 +1,130 @@
+import threading
+import time
+
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 from ..utils.config import get_connection, get_wita
+from ..utils.db_routing import get_read_connection
+from ..utils.helper import search_params
+from ..utils.pengaturan_cache import add_listen_handler
+from ..utils.resource_version import bump_resource_version
+
+
+# === Cache Katalog per Barcode (scan kasir) === #
+# Dibangun dari get_all_produk; dikosongkan saat produk berubah di worker mana pun
+PRODUK_CHANNEL = "produk_changed"
+KATALOG_TTL = 300
+
+_katalog = {}
+_katalog_loaded_at = None  # None = perlu dibangun ulang
+_katalog_generation = 0  # naik setiap reset; refresh yang dimulai sebelumnya tidak dipublikasikan
+_katalog_lock = threading.Lock()
+
+
+def _fetch_all_produk(connection):
+    result = connection.execute(text("""
+        SELECT id_produk, nama_produk, barcode, kategori, satuan, harga_beli, harga_jual, expired_date, stok_optimal
+        FROM produk
+        WHERE status = 1;   
+    """)).mappings().fetchall()
+    return [dict(row) for row in result]
 
 
 def get_all_produk():
+    engine = get_connection()
+    try:
+        with engine.connect() as connection:
+            return _fetch_all_produk(connection)
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return []
+
+
+def refresh_katalog_produk():
+    """Membangun ulang cache barcode -> produk di worker ini."""
+    global _katalog, _katalog_loaded_at
+    generation = _katalog_generation
+
+    # error DB tidak dipublikasikan sebagai katalog kosong; dicoba lagi pada scan berikutnya
+    engine = get_connection()
+    try:
+        with engine.connect() as connection:
+            rows = _fetch_all_produk(connection)
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return
+
+    katalog = {row["barcode"]: row for row in rows if row.get("barcode")}
+    with _katalog_lock:
+        # reset selama query: hasil ini bisa mendahului perubahan, biarkan basi
+        if generation != _katalog_generation:
+            return
+        _katalog = katalog
+        _katalog_loaded_at = time.monotonic()
+
+
+def reset_katalog_produk():
+    """Menandai katalog worker ini basi (setelah commit perubahan atau dari NOTIFY)."""
+    global _katalog_loaded_at, _katalog_generation
+    with _katalog_lock:
+        _katalog_generation += 1
+        _katalog_loaded_at = None
+
+
+def invalidate_katalog_produk(connection):
+    """Memberi tahu semua worker (termasuk ini) bahwa katalog berubah; terkirim saat commit."""
+    connection.execute(text("SELECT pg_notify(:channel, '')"), {"channel": PRODUK_CHANNEL})
+
+
+add_listen_handler(PRODUK_CHANNEL, reset_katalog_produk)
+
+
+def get_produk_by_barcode(barcode):
+    loaded_at = _katalog_loaded_at
+    if loaded_at is None or time.monotonic() - loaded_at > KATALOG_TTL:
+        refresh_katalog_produk()
+
+    # katalog basi (refresh gagal/dibatalkan) tidak dipakai; langsung ke index barcode
+    if _katalog_loaded_at is not None:
+        produk = _katalog.get(barcode)
+        if produk is not None:
+            return produk
+
+    # cold miss (mis. produk baru dari worker lain): pakai index unik barcode
     engine = get_connection()
     try:
         with engine.connect() as connection:
             result = connection.execute(text("""
                 SELECT id_produk, nama_produk, barcode, kategori, satuan, harga_beli, harga_jual, expired_date, stok_optimal
                 FROM produk
-                WHERE status = 1;   
-            """)).mappings().fetchall()
+                WHERE barcode = :barcode
+                AND status = 1;
+            """), {'barcode': barcode}).mappings().fetchone()
+            return dict(result) if result else None
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return None
 
-            produk_list = []
-            for row in result:
-                data = dict(row)
-                if data["expired_date"]:
-                    data["expired_date"] = data["expired_date"].isoformat()
-                produk_list.append(data)
 
-            return produk_list
+def search_produk(q, limit=None):
+    """Typeahead produk: cocok nama/barcode (index trigram), barcode persis & prefix di atas."""
+    params = search_params(q, limit)
+    engine = get_read_connection()
+    try:
+        with engine.connect() as connection:
+            result = connection.execute(text("""
+                SELECT id_produk, nama_produk, barcode, kategori, satuan, harga_beli, harga_jual, expired_date, stok_optimal
+                FROM produk
+                WHERE status = 1
+                AND (nama_produk ILIKE :pola OR barcode ILIKE :pola)
+                ORDER BY
+                    (barcode = :q) DESC,
+                    (nama_produk ILIKE :prefix OR barcode ILIKE :prefix) DESC,
+                    similarity(nama_produk, :q) DESC,
+                    nama_produk
+                LIMIT :limit;
+            """), params).mappings().fetchall()
+            return [dict(row) for row in result]
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return []
@@ -51,13 +155,7 @@ def get_produk_by_id(id_produk):
                 AND status = 1;   
             """), {'id_produk': id_produk}).mappings().fetchone()
             
-            if result:
-                data = dict(result)
-                if data["expired_date"]:
-                    data["expired_date"] = data["expired_date"].isoformat()
-                return data
-            else:
-                return None
+            return dict(result) if result else None
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return []
@@ -86,7 +184,11 @@ def update_produk(id_produk, data):
                     ),
                 {**data, 'id_produk': id_produk, 'timestamp_wita': timestamp_wita}
             ).fetchone()
-            return result
+            if result:
+                invalidate_katalog_produk(connection)
+                bump_resource_version(connection, "produk", "reward_poin")
+        reset_katalog_produk()
+        return result
     except SQLAlchemyError as e:
         print(f"Error: {e}")
         return None
@@ -100,7 +202,11 @@ def delete_produk(id_produk):
                 text("UPDATE produk SET status = 0, updated_at = :timestamp_wita WHERE status = 1 AND id_produk = :id_produk RETURNING nama_produk;"),
                 {'id_produk': id_produk, 'timestamp_wita': timestamp_wita}
             ).fetchone()
-            return result
+            if result:
+                invalidate_katalog_produk(connection)
+                bump_resource_version(connection, "produk", "reward_poin")
+        reset_katalog_produk()
+        return result
     except SQLAlchemyError as e:
         print(f"Error: {e}")
-        return None
\ No newline at end of file
+        return None
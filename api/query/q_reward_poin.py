@@ -8,6 +8,8 @@ from api.utils.helper import serialize_datetime
 
 from ..utils.config import get_connection, get_wita
 
+from ..utils.resource_version import bump_resource_version
+
 
 # =========================================================
 # GET ALL REWARD
@@ -177,6 +179,8 @@ def insert_reward_poin(payload):
 
             id_reward = result.scalar()
 
+            bump_resource_version(connection, "reward_poin")
+
             return {
                 "id_reward": id_reward,
                 "id_produk": id_produk,
@@ -236,6 +240,8 @@ def update_reward_poin(id_reward, payload):
             if not result:
                 return None
 
+            bump_resource_version(connection, "reward_poin")
+
             produk = connection.execute(text("""
                 SELECT nama_produk
                 FROM produk
@@ -289,6 +295,8 @@ def delete_reward_poin(id_reward):
             if not result:
                 return None
 
+            bump_resource_version(connection, "reward_poin")
+
             produk = connection.execute(text("""
                 SELECT nama_produk
                 FROM produk
@@ -1,27 +1,13 @@
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 from ..utils.config import get_connection, get_wita
-
-
-def get_stok(id_stok):
-    engine = get_connection()
-    try:
-        with engine.connect() as connection:
-            # Ambil id_produk dari stok
-            result = connection.execute(text("""
-                SELECT id_produk FROM stok WHERE id_stok = :id_stok AND status = 1
-            """), {"id_stok": id_stok}).mappings().fetchone()
-
-            if not result:
-                return None  # stok tidak ditemukan atau sudah nonaktif
-            return result["id_produk"]
-    except SQLAlchemyError as e:
-        print(f"Error: {str(e)}")
-        return []
+from ..utils.resource_version import bump_resource_version
+from .q_produk import invalidate_katalog_produk, reset_katalog_produk
+from ..utils.db_routing import get_read_connection
 
 
 def get_all_stok(lokasi_id=None):
-    engine = get_connection()
+    engine = get_read_connection()
     try:
         with engine.connect() as connection:
             query = """
@@ -40,14 +26,7 @@ def get_all_stok(lokasi_id=None):
                 params["lokasi_id"] = lokasi_id
 
             result = connection.execute(text(query), params).mappings().fetchall()
-            
-            data = []
-            for row in result:
-                row_dict = dict(row)
-                if row_dict.get("expired_date"):
-                    row_dict["expired_date"] = row_dict["expired_date"].isoformat()
-                data.append(row_dict)
-            return data
+            return [dict(row) for row in result]
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return []
@@ -89,25 +68,37 @@ def insert_stok(data):
                 "jumlah": data["jumlah"],
                 "timestamp_wita": timestamp_wita
             })
+            invalidate_katalog_produk(connection)
+            bump_resource_version(connection, "produk", "reward_poin", "stok")
 
-            return {
-                "id_produk": id_produk,
-                "jumlah": data["jumlah"],
-                "satuan": result_produk["satuan"],
-                "nama_produk": result_produk["nama_produk"]
-            }
+        reset_katalog_produk()
+        return {
+            "id_produk": id_produk,
+            "jumlah": data["jumlah"],
+            "satuan": result_produk["satuan"],
+            "nama_produk": result_produk["nama_produk"]
+        }
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return None
 
+def _lock_stok(connection, id_stok):
+    # id_produk dari stok aktif, dikunci di transaksi pemanggil (bukan koneksi terpisah)
+    return connection.execute(text("""
+        SELECT id_produk FROM stok WHERE id_stok = :id_stok AND status = 1 FOR UPDATE
+    """), {"id_stok": id_stok}).scalar()
+
+
 def update_stok(id_stok, data):
     timestamp_wita = get_wita()
     engine = get_connection()
     try:
         with engine.begin() as connection:
-            id_produk = get_stok(id_stok)
+            id_produk = _lock_stok(connection, id_stok)
+            if id_produk is None:
+                return None
 
-            # Update produk
+            # Update produk hanya jika ada field yang berubah
             result_produk = connection.execute(text("""
                 UPDATE produk SET
                     nama_produk = :nama_produk,
@@ -120,6 +111,9 @@ def update_stok(id_stok, data):
                     stok_optimal = :stok_optimal,
                     updated_at = :timestamp_wita
                 WHERE id_produk = :id_produk
+                AND (nama_produk, barcode, kategori, satuan, harga_beli, harga_jual, expired_date, stok_optimal)
+                    IS DISTINCT FROM
+                    (:nama_produk, :barcode, :kategori, :satuan, :harga_beli, :harga_jual, :expired_date, :stok_optimal)
                 RETURNING id_produk, nama_produk, satuan
             """), {
                 "id_produk": id_produk,
@@ -134,6 +128,12 @@ def update_stok(id_stok, data):
                 "timestamp_wita": timestamp_wita
             }).mappings().fetchone()
 
+            produk_berubah = result_produk is not None
+            if not produk_berubah:
+                result_produk = connection.execute(text("""
+                    SELECT nama_produk, satuan FROM produk WHERE id_produk = :id_produk
+                """), {"id_produk": id_produk}).mappings().fetchone()
+
             # Update stok
             connection.execute(text("""
                 UPDATE stok SET
@@ -147,13 +147,19 @@ def update_stok(id_stok, data):
                 "timestamp_wita": timestamp_wita,
                 "id_stok": id_stok
             })
+            bump_resource_version(connection, "stok")
+            if produk_berubah:
+                invalidate_katalog_produk(connection)
+                bump_resource_version(connection, "produk", "reward_poin")
 
-            return {
-                "id_produk": id_produk,
-                "jumlah": data["jumlah"],
-                "satuan": result_produk["satuan"],
-                "nama_produk": result_produk["nama_produk"]
-            }
+        if produk_berubah:
+            reset_katalog_produk()
+        return {
+            "id_produk": id_produk,
+            "jumlah": data["jumlah"],
+            "satuan": result_produk["satuan"],
+            "nama_produk": result_produk["nama_produk"]
+        }
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return None
@@ -163,13 +169,16 @@ def delete_stok(id_stok):
     engine = get_connection()
     try:
         with engine.begin() as connection:
-            id_produk = get_stok(id_stok)
+            id_produk = _lock_stok(connection, id_stok)
+            if id_produk is None:
+                return None
 
             # Nonaktifkan stok
             connection.execute(text("""
                 UPDATE stok SET status = 0, updated_at = :timestamp_wita
                 WHERE id_stok = :id_stok
             """), {"id_stok": id_stok, "timestamp_wita": timestamp_wita})
+            bump_resource_version(connection, "stok")
 
             # Nonaktifkan produk
             result_produk = connection.execute(text("""
@@ -177,8 +186,160 @@ def delete_stok(id_stok):
                 WHERE id_produk = :id_produk
                 RETURNING nama_produk
             """), {"id_produk": id_produk, "timestamp_wita": timestamp_wita}).mappings().fetchone()
+            if result_produk:
+                invalidate_katalog_produk(connection)
+                bump_resource_version(connection, "produk", "reward_poin")
+
+        if result_produk:
+            reset_katalog_produk()
+        return result_produk["nama_produk"] if result_produk else None
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return None
 
-            return result_produk["nama_produk"] if result_produk else None
+
+# === Stok Opname (bulk) === #
+OPNAME_MAX_BARIS = 20000
+
+
+def _parse_opname_rows(rows):
+    if not isinstance(rows, list) or not rows:
+        raise ValueError("items wajib berisi minimal 1 baris.")
+    if len(rows) > OPNAME_MAX_BARIS:
+        raise ValueError(f"Maksimal {OPNAME_MAX_BARIS} baris per opname.")
+
+    id_lokasi_list, id_produk_list, jumlah_fisik_list = [], [], []
+    seen = set()
+    for index, row in enumerate(rows):
+        try:
+            id_lokasi = int(row["id_lokasi"])
+            id_produk = int(row["id_produk"])
+            jumlah_fisik = int(row["jumlah_fisik"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Baris {index}: id_lokasi, id_produk dan jumlah_fisik wajib berupa angka.")
+        if jumlah_fisik < 0:
+            raise ValueError(f"Baris {index}: jumlah_fisik tidak boleh negatif.")
+        if (id_lokasi, id_produk) in seen:
+            raise ValueError(f"Baris {index}: produk {id_produk} di lokasi {id_lokasi} duplikat.")
+        seen.add((id_lokasi, id_produk))
+
+        id_lokasi_list.append(id_lokasi)
+        id_produk_list.append(id_produk)
+        jumlah_fisik_list.append(jumlah_fisik)
+    return id_lokasi_list, id_produk_list, jumlah_fisik_list
+
+
+def stok_opname(rows, id_user=None, catatan=None):
+    """
+    Terapkan hasil hitung fisik sekaligus: input dimuat ke temp table, stok
+    dikunci & di-update dalam satu UPDATE ... FROM, selisih dicatat ke
+    stok_opname_detail. Mengembalikan ringkasan.
+    """
+    id_lokasi_list, id_produk_list, jumlah_fisik_list = _parse_opname_rows(rows)
+    timestamp_wita = get_wita()
+    engine = get_connection()
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("""
+                CREATE TEMP TABLE opname_input (
+                    id_lokasi INTEGER NOT NULL,
+                    id_produk INTEGER NOT NULL,
+                    jumlah_fisik INTEGER NOT NULL
+                ) ON COMMIT DROP
+            """))
+            connection.execute(text("""
+                INSERT INTO opname_input (id_lokasi, id_produk, jumlah_fisik)
+                SELECT * FROM unnest(
+                    CAST(:id_lokasi_list AS INTEGER[]),
+                    CAST(:id_produk_list AS INTEGER[]),
+                    CAST(:jumlah_fisik_list AS INTEGER[])
+                )
+            """), {
+                "id_lokasi_list": id_lokasi_list,
+                "id_produk_list": id_produk_list,
+                "jumlah_fisik_list": jumlah_fisik_list,
+            })
+            connection.execute(text("ANALYZE opname_input"))
+
+            id_opname = connection.execute(text("""
+                INSERT INTO stok_opname (id_user, catatan, created_at)
+                VALUES (:id_user, :catatan, :timestamp_wita)
+                RETURNING id_opname
+            """), {"id_user": id_user, "catatan": catatan, "timestamp_wita": timestamp_wita}).scalar()
+
+            # kunci urut (id_lokasi, id_produk) seperti checkout agar tidak deadlock
+            ringkasan = connection.execute(text("""
+                WITH lama AS (
+                    SELECT s.id_stok, s.id_lokasi, s.id_produk,
+                        s.jumlah AS jumlah_sistem, i.jumlah_fisik
+                    FROM stok s
+                    INNER JOIN opname_input i
+                        ON s.id_lokasi = i.id_lokasi AND s.id_produk = i.id_produk
+                    WHERE s.status = 1
+                    ORDER BY s.id_lokasi, s.id_produk
+                    FOR UPDATE OF s
+                ),
+                diupdate AS (
+                    UPDATE stok s
+                    SET jumlah = l.jumlah_fisik, updated_at = :timestamp_wita
+                    FROM lama l
+                    WHERE s.id_stok = l.id_stok
+                    AND l.jumlah_sistem <> l.jumlah_fisik
+                    RETURNING s.id_stok
+                ),
+                selisih AS (
+                    INSERT INTO stok_opname_detail
+                        (id_opname, id_stok, id_lokasi, id_produk, jumlah_sistem, jumlah_fisik, selisih)
+                    SELECT :id_opname, l.id_stok, l.id_lokasi, l.id_produk,
+                        l.jumlah_sistem, l.jumlah_fisik, l.jumlah_fisik - l.jumlah_sistem
+                    FROM lama l
+                    WHERE l.jumlah_sistem <> l.jumlah_fisik
+                    RETURNING id_produk, selisih
+                )
+                SELECT
+                    (SELECT COUNT(*) FROM lama) AS jumlah_baris,
+                    (SELECT COUNT(*) FROM diupdate) AS jumlah_selisih,
+                    COALESCE((SELECT SUM(selisih) FROM selisih), 0) AS total_selisih,
+                    COALESCE((
+                        SELECT SUM(d.selisih * COALESCE(p.harga_beli, 0))
+                        FROM selisih d
+                        INNER JOIN produk p ON p.id_produk = d.id_produk
+                    ), 0) AS nilai_selisih
+            """), {"id_opname": id_opname, "timestamp_wita": timestamp_wita}).mappings().fetchone()
+
+            connection.execute(text("""
+                UPDATE stok_opname
+                SET jumlah_baris = :jumlah_baris,
+                    jumlah_selisih = :jumlah_selisih,
+                    total_selisih = :total_selisih,
+                    nilai_selisih = :nilai_selisih
+                WHERE id_opname = :id_opname
+            """), {**ringkasan, "id_opname": id_opname})
+            bump_resource_version(connection, "stok")
+
+            # baris input tanpa stok aktif di lokasi tsb (tidak diterapkan)
+            tidak_ditemukan = connection.execute(text("""
+                SELECT i.id_lokasi, i.id_produk
+                FROM opname_input i
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM stok s
+                    WHERE s.id_lokasi = i.id_lokasi
+                    AND s.id_produk = i.id_produk
+                    AND s.status = 1
+                )
+                ORDER BY i.id_lokasi, i.id_produk
+            """)).mappings().fetchall()
+
+            return {
+                "id_opname": id_opname,
+                "jumlah_input": len(id_produk_list),
+                "jumlah_baris": ringkasan["jumlah_baris"],
+                "jumlah_sesuai": ringkasan["jumlah_baris"] - ringkasan["jumlah_selisih"],
+                "jumlah_selisih": ringkasan["jumlah_selisih"],
+                "total_selisih": ringkasan["total_selisih"],
+                "nilai_selisih": ringkasan["nilai_selisih"],
+                "tidak_ditemukan": [dict(row) for row in tidak_ditemukan],
+            }
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
         return None
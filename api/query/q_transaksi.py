@@ -1,10 +1,69 @@
 # api/query/q_transaksi.py
 
-from datetime import date, datetime
+import pytz
+from datetime import datetime
 from flask import request
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 from ..utils.config import get_connection, get_wita
+from ..utils.db_routing import get_read_connection
+from ..utils.helper import date_range_filter, decode_cursor, encode_cursor
+from ..utils.metrics import CHECKOUT_TOTAL, STOK_RESERVASI_GAGAL_TOTAL
+from ..utils.pengaturan_cache import get_pengaturan
+from .q_idempotency import (
+    claim_idempotency_key,
+    hash_payload,
+    save_idempotency_response
+)
+from .q_hutang import adjust_total_hutang
+from .q_penjualan_harian import upsert_penjualan_harian
+
+
+# batas jumlah transaksi per halaman pada GET /transaksi/
+TRANSAKSI_DEFAULT_LIMIT = 50
+TRANSAKSI_MAX_LIMIT = 200
+
+# batas sinkronisasi antrean offline pada POST /transaksi/batch
+TRANSAKSI_BATCH_MAX = 500
+
+
+# =========================================================
+# HELPER: DETAIL ITEM PER TRANSAKSI (BATCH)
+# =========================================================
+
+def _get_items_by_transaksi(connection, id_transaksi_list):
+
+    items_map = {}
+
+    if not id_transaksi_list:
+        return items_map
+
+    result = connection.execute(text("""
+        SELECT
+            dt.id_transaksi,
+            dt.id_produk,
+            pr.nama_produk,
+            dt.qty,
+            dt.harga_jual
+        FROM detailtransaksi dt
+        INNER JOIN produk pr
+            ON dt.id_produk = pr.id_produk
+        WHERE dt.id_transaksi = ANY(:id_transaksi_list)
+        AND dt.status = 1;
+    """), {
+        "id_transaksi_list": list(set(id_transaksi_list))
+    }).mappings().fetchall()
+
+    for item in result:
+
+        items_map.setdefault(item["id_transaksi"], []).append({
+            "id_produk": item["id_produk"],
+            "nama_produk": item["nama_produk"],
+            "qty": item["qty"],
+            "harga_jual": item["harga_jual"]
+        })
+
+    return items_map
 
 
 # =========================================================
@@ -13,7 +72,7 @@ from ..utils.config import get_connection, get_wita
 
 def get_all_transaksi():
 
-    engine = get_connection()
+    engine = get_read_connection()
 
     try:
 
@@ -24,16 +83,26 @@ def get_all_transaksi():
             status_hutang = request.args.get("status_hutang")
             id_lokasi = request.args.get("id_lokasi")
 
+            limit = request.args.get(
+                "limit", TRANSAKSI_DEFAULT_LIMIT, type=int
+            )
+            cursor = request.args.get("cursor")
+
+            limit = max(1, min(limit, TRANSAKSI_MAX_LIMIT))
+
             conditions = ["t.status = 1"]
-            params = {}
+            params = {"limit": limit + 1}
 
             if id_pelanggan:
                 conditions.append("t.id_pelanggan = :id_pelanggan")
                 params["id_pelanggan"] = id_pelanggan
 
             if tanggal:
-                conditions.append("t.tanggal = :tanggal")
-                params["tanggal"] = tanggal
+                clause, range_params = date_range_filter(
+                    "t.tanggal", tanggal, tanggal
+                )
+                conditions.append(clause)
+                params.update(range_params)
 
             if id_lokasi:
                 conditions.append("t.id_lokasi = :id_lokasi")
@@ -51,6 +120,26 @@ def get_all_transaksi():
                         "h.status_hutang = 'belum lunas'"
                     )
 
+            # =========================================================
+            # KEYSET PAGINATION (tanggal, id_transaksi)
+            # =========================================================
+
+            if cursor:
+
+                cursor_tanggal, cursor_id = decode_cursor(cursor, 2)
+
+                try:
+                    params["cursor_tanggal"] = datetime.fromisoformat(
+                        cursor_tanggal
+                    )
+                    params["cursor_id"] = int(cursor_id)
+                except ValueError:
+                    raise ValueError("Cursor tidak valid.")
+
+                conditions.append(
+                    "(t.tanggal, t.id_transaksi) < (:cursor_tanggal, :cursor_id)"
+                )
+
             where_clause = " AND ".join(conditions)
 
             query = f"""
@@ -59,7 +148,8 @@ def get_all_transaksi():
                     u.username, l.nama_lokasi,
                     p.nama_pelanggan, p.kontak, p.alamat, p.poin,
                     t.tanggal, t.total, t.tunai, t.kembalian,
-                    h.sisa_hutang, h.status_hutang
+                    h.sisa_hutang, h.status_hutang,
+                    COALESCE(p.total_hutang, 0) AS total_hutang
                 FROM transaksi t
                 INNER JOIN users u
                     ON t.id_kasir = u.id_user
@@ -70,449 +160,672 @@ def get_all_transaksi():
                 LEFT JOIN hutang h
                     ON t.id_transaksi = h.id_transaksi
                 WHERE {where_clause}
-                ORDER BY t.tanggal DESC;
+                ORDER BY t.tanggal DESC, t.id_transaksi DESC
+                LIMIT :limit;
             """
             result = connection.execute(
                 text(query),
                 params
             ).mappings().fetchall()
 
-            data = []
+            rows = [dict(row) for row in result]
 
-            for row in result:
-
-                row_dict = dict(row)
-
-                if isinstance(row_dict["tanggal"], (date, datetime)):
-                    row_dict["tanggal"] = row_dict["tanggal"].isoformat()
-
-                id_transaksi = row_dict["id_transaksi"]
-                id_pelanggan = row_dict.get("id_pelanggan")
-
-                # =========================================================
-                # DETAIL ITEM
-                # =========================================================
-
-                detail_result = connection.execute(text("""
-                    SELECT
-                        dt.id_produk,
-                        pr.nama_produk,
-                        dt.qty,
-                        dt.harga_jual
-                    FROM detailtransaksi dt
-                    INNER JOIN produk pr
-                        ON dt.id_produk = pr.id_produk
-                    WHERE dt.id_transaksi = :id_transaksi
-                    AND dt.status = 1;
-                """), {
-                    "id_transaksi": id_transaksi
-                }).mappings().fetchall()
-
-                row_dict["items"] = [
-                    {
-                        "id_produk": item["id_produk"],
-                        "nama_produk": item["nama_produk"],
-                        "qty": item["qty"],
-                        "harga_jual": item["harga_jual"]
-                    }
-                    for item in detail_result
-                ]
-
-                # =========================================================
-                # TOTAL HUTANG
-                # =========================================================
-
-                total_hutang = 0
-
-                if id_pelanggan:
-
-                    hutang_result = connection.execute(text("""
-                        SELECT
-                            SUM(sisa_hutang) AS total_hutang
-                        FROM hutang
-                        WHERE id_pelanggan = :id_pelanggan
-                        AND status = 1;
-                    """), {
-                        "id_pelanggan": id_pelanggan
-                    }).mappings().fetchone()
+            next_cursor = None
 
-                    total_hutang = (
-                        hutang_result["total_hutang"]
-                        if hutang_result["total_hutang"] is not None
-                        else 0
-                    )
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(
+                    rows[-1]["tanggal"],
+                    rows[-1]["id_transaksi"]
+                )
+
+            # =========================================================
+            # DETAIL ITEM (BATCH)
+            # =========================================================
+
+            items_map = _get_items_by_transaksi(
+                connection,
+                [row["id_transaksi"] for row in rows]
+            )
 
-                row_dict["total_hutang"] = total_hutang
+            data = []
+
+            for row_dict in rows:
+
+                row_dict["items"] = items_map.get(
+                    row_dict["id_transaksi"], []
+                )
 
                 data.append(row_dict)
 
-            return data
+            return data, next_cursor
 
     except SQLAlchemyError as e:
         print(f"Error occurred: {str(e)}")
-        return []
+        return [], None
 
 
 # =========================================================
-# INSERT TRANSAKSI
+# HELPER: VALUES LIST UNTUK STATEMENT SET-BASED
 # =========================================================
 
-def insert_transaksi(payload):
+def _build_values(columns, rows):
+    """
+    Membentuk '(:id_produk_0, :qty_0), (:id_produk_1, :qty_1), ...'
+    beserta parameternya untuk dipakai di FROM (VALUES ...).
+    """
 
-    timestamp_wita = get_wita()
+    placeholders = []
+    params = {}
 
-    engine = get_connection()
+    for i, row in enumerate(rows):
 
-    try:
+        placeholders.append(
+            "(" + ", ".join(f"CAST(:{col}_{i} AS INTEGER)" for col in columns) + ")"
+        )
 
-        with engine.begin() as connection:
+        for col in columns:
+            params[f"{col}_{i}"] = row.get(col)
 
-            id_kasir = payload.get("id_kasir")
-            id_lokasi = payload.get("id_lokasi")
+    return ", ".join(placeholders), params
 
-            id_pelanggan = payload.get("id_pelanggan")
 
-            nama_pelanggan = payload.get("nama_pelanggan")
-            kontak = payload.get("kontak")
-            alamat = payload.get("alamat")
+# =========================================================
+# INSERT TRANSAKSI
+# =========================================================
 
-            total = payload.get("total")
-            tunai = payload.get("tunai")
+def validate_transaksi_payload(payload):
 
-            items = payload.get("items", [])
+    if not isinstance(payload, dict):
+        raise ValueError("Format transaksi tidak valid.")
 
-            # =========================================================
-            # VALIDASI
-            # =========================================================
+    id_kasir = payload.get("id_kasir")
+    id_lokasi = payload.get("id_lokasi")
 
-            if not id_kasir or not id_lokasi:
-                raise ValueError(
-                    "Field id_kasir dan id_lokasi wajib diisi."
-                )
+    total = payload.get("total")
+    tunai = payload.get("tunai")
 
-            if total is None or tunai is None:
-                raise ValueError(
-                    "Field total dan tunai wajib diisi."
-                )
+    items = payload.get("items", [])
 
-            if not items or not isinstance(items, list):
-                raise ValueError(
-                    "Daftar produk (items) tidak boleh kosong."
-                )
+    if not id_kasir or not id_lokasi:
+        raise ValueError(
+            "Field id_kasir dan id_lokasi wajib diisi."
+        )
 
-            kembalian = tunai - total if tunai >= total else 0
-            sisa_hutang = total - tunai if tunai < total else 0
+    if total is None or tunai is None:
+        raise ValueError(
+            "Field total dan tunai wajib diisi."
+        )
 
-            # =========================================================
-            # TAMBAH PELANGGAN BARU
-            # =========================================================
+    if not items or not isinstance(items, list):
+        raise ValueError(
+            "Daftar produk (items) tidak boleh kosong."
+        )
 
-            if not id_pelanggan and nama_pelanggan:
-
-                result = connection.execute(text("""
-                    INSERT INTO pelanggan (
-                        nama_pelanggan,
-                        kontak,
-                        alamat,
-                        poin,
-                        status,
-                        created_at,
-                        updated_at
-                    )
-                    VALUES (
-                        :nama_pelanggan,
-                        :kontak,
-                        :alamat,
-                        0,
-                        1,
-                        :timestamp_wita,
-                        :timestamp_wita
-                    )
-                    RETURNING id_pelanggan;
-                """), {
-                    "nama_pelanggan": nama_pelanggan,
-                    "kontak": kontak,
-                    "alamat": alamat,
-                    "timestamp_wita": timestamp_wita
-                })
+    for item in items:
 
-                id_pelanggan = result.scalar()
+        if not isinstance(item, dict):
+            raise ValueError("Format item tidak valid.")
 
-            # =========================================================
-            # VALIDASI HUTANG
-            # =========================================================
+        id_produk = item.get("id_produk")
+        qty = item.get("qty")
+        harga_jual = item.get("harga_jual")
 
-            if tunai < total and not id_pelanggan:
-                raise ValueError(
-                    "Pelanggan wajib diisi jika transaksi hutang."
-                )
+        if not id_produk:
+            raise ValueError("id_produk wajib diisi.")
+
+        # stok_map memakai id_produk int dari DB: "12" dan 12 harus jadi kunci yang sama
+        if isinstance(id_produk, str) and id_produk.strip().isdigit():
+            id_produk = int(id_produk)
+
+        if isinstance(id_produk, bool) or not isinstance(id_produk, int):
+            raise ValueError(f"id_produk tidak valid: {id_produk}.")
+
+        item["id_produk"] = id_produk
 
-            # =========================================================
-            # INSERT TRANSAKSI
-            # =========================================================
+        if qty is None or qty <= 0:
+            raise ValueError(
+                f"Qty tidak valid untuk produk ID {id_produk}."
+            )
 
-            result = connection.execute(text("""
-                INSERT INTO transaksi (
-                    id_kasir,
-                    id_lokasi,
+        if harga_jual is None or harga_jual < 0:
+            raise ValueError(
+                f"Harga jual tidak valid untuk produk ID {id_produk}."
+            )
+
+
+def _insert_transaksi(connection, payload, timestamp_wita, tanggal,
+                      idempotency_key=None, idempotency_scope=None):
+    """
+    Inti proses checkout di atas koneksi/transaksi milik pemanggil.
+    Dipakai oleh insert_transaksi dan insert_transaksi_batch.
+    Mengembalikan (response, replay); replay True jika response diambil
+    dari idempotency key yang sudah tersimpan.
+    """
+
+    # =========================================================
+    # VALIDASI
+    # =========================================================
+
+    # sebelum hash idempotency: payload sudah dinormalisasi (id_produk int)
+    validate_transaksi_payload(payload)
+
+    # =========================================================
+    # IDEMPOTENCY KEY (REPLAY)
+    # =========================================================
+
+    if idempotency_key:
+
+        stored_response = claim_idempotency_key(
+            connection,
+            idempotency_scope,
+            idempotency_key,
+            hash_payload(payload),
+            timestamp_wita
+        )
+
+        if stored_response is not None:
+            return stored_response, True
+
+    id_kasir = payload.get("id_kasir")
+    id_lokasi = payload.get("id_lokasi")
+
+    id_pelanggan = payload.get("id_pelanggan")
+
+    nama_pelanggan = payload.get("nama_pelanggan")
+    kontak = payload.get("kontak")
+    alamat = payload.get("alamat")
+
+    total = payload.get("total")
+    tunai = payload.get("tunai")
+
+    items = payload.get("items", [])
+
+    kembalian = tunai - total if tunai >= total else 0
+    sisa_hutang = total - tunai if tunai < total else 0
+
+    # =========================================================
+    # TAMBAH PELANGGAN BARU
+    # =========================================================
+
+    if not id_pelanggan and nama_pelanggan:
+
+        result = connection.execute(text("""
+            INSERT INTO pelanggan (
+                nama_pelanggan,
+                kontak,
+                alamat,
+                poin,
+                status,
+                created_at,
+                updated_at
+            )
+            VALUES (
+                :nama_pelanggan,
+                :kontak,
+                :alamat,
+                0,
+                1,
+                :timestamp_wita,
+                :timestamp_wita
+            )
+            RETURNING id_pelanggan;
+        """), {
+            "nama_pelanggan": nama_pelanggan,
+            "kontak": kontak,
+            "alamat": alamat,
+            "timestamp_wita": timestamp_wita
+        })
+
+        id_pelanggan = result.scalar()
+
+    # =========================================================
+    # VALIDASI HUTANG
+    # =========================================================
+
+    if tunai < total and not id_pelanggan:
+        raise ValueError(
+            "Pelanggan wajib diisi jika transaksi hutang."
+        )
+
+    # =========================================================
+    # INSERT TRANSAKSI
+    # =========================================================
+
+    result = connection.execute(text("""
+        INSERT INTO transaksi (
+            id_kasir,
+            id_lokasi,
+            id_pelanggan,
+            tanggal,
+            total,
+            tunai,
+            kembalian,
+            status,
+            created_at,
+            updated_at
+        )
+        VALUES (
+            :id_kasir,
+            :id_lokasi,
+            :id_pelanggan,
+            :tanggal,
+            :total,
+            :tunai,
+            :kembalian,
+            1,
+            :timestamp_wita,
+            :timestamp_wita
+        )
+        RETURNING id_transaksi;
+    """), {
+        "id_kasir": id_kasir,
+        "id_lokasi": id_lokasi,
+        "id_pelanggan": id_pelanggan,
+        "tanggal": tanggal,
+        "total": total,
+        "tunai": tunai,
+        "kembalian": kembalian,
+        "timestamp_wita": timestamp_wita
+    })
+
+    id_transaksi = result.scalar()
+
+    # =========================================================
+    # HITUNG POIN
+    # =========================================================
+
+    earned_point = 0
+
+    if id_pelanggan:
+
+        # =========================================================
+        # AMBIL PENGATURAN POIN
+        # =========================================================
+
+        poin_kelipatan = int(get_pengaturan("poin_kelipatan", 35000, connection))
+
+        # =========================================================
+        # HITUNG POIN
+        # =========================================================
+
+        earned_point = total // poin_kelipatan
+
+        if earned_point > 0:
+
+            # update poin pelanggan
+            connection.execute(text("""
+                UPDATE pelanggan
+                SET
+                    poin = poin + :earned_point,
+                    updated_at = :timestamp_wita
+                WHERE id_pelanggan = :id_pelanggan
+                AND status = 1
+                RETURNING poin;
+            """), {
+                "earned_point": earned_point,
+                "id_pelanggan": id_pelanggan,
+                "timestamp_wita": timestamp_wita
+            })
+
+            # insert histori poin
+            connection.execute(text("""
+                INSERT INTO poin_pelanggan (
                     id_pelanggan,
-                    tanggal,
-                    total,
-                    tunai,
-                    kembalian,
+                    id_transaksi,
+                    tipe,
+                    poin,
+                    deskripsi,
                     status,
                     created_at,
                     updated_at
                 )
                 VALUES (
-                    :id_kasir,
-                    :id_lokasi,
                     :id_pelanggan,
-                    :tanggal,
-                    :total,
-                    :tunai,
-                    :kembalian,
+                    :id_transaksi,
+                    'earn',
+                    :earned_point,
+                    :deskripsi,
                     1,
                     :timestamp_wita,
                     :timestamp_wita
-                )
-                RETURNING id_transaksi;
+                );
             """), {
-                "id_kasir": id_kasir,
-                "id_lokasi": id_lokasi,
                 "id_pelanggan": id_pelanggan,
-                "tanggal": timestamp_wita.date(),
-                "total": total,
-                "tunai": tunai,
-                "kembalian": kembalian,
+                "id_transaksi": id_transaksi,
+                "earned_point": earned_point,
+                "deskripsi": f"Poin dari transaksi #{id_transaksi}",
                 "timestamp_wita": timestamp_wita
             })
 
-            id_transaksi = result.scalar()
+        total_poin = connection.execute(text("""
+                        SELECT poin FROM pelanggan
+                        WHERE id_pelanggan = :id_pelanggan
+                        AND status = 1
+                    """), {
+                        "id_pelanggan": id_pelanggan
+                    }).scalar()
+
+    # =========================================================
+    # INSERT HUTANG
+    # =========================================================
+
+    if tunai < total:
+
+        connection.execute(text("""
+            INSERT INTO hutang (
+                id_transaksi,
+                id_pelanggan,
+                sisa_hutang,
+                status_hutang,
+                status,
+                created_at,
+                updated_at
+            )
+            VALUES (
+                :id_transaksi,
+                :id_pelanggan,
+                :sisa_hutang,
+                'belum lunas',
+                1,
+                :timestamp_wita,
+                :timestamp_wita
+            );
+        """), {
+            "id_transaksi": id_transaksi,
+            "id_pelanggan": id_pelanggan,
+            "sisa_hutang": sisa_hutang,
+            "timestamp_wita": timestamp_wita
+        })
+
+        adjust_total_hutang(connection, id_pelanggan, sisa_hutang)
+
+    # =========================================================
+    # INSERT DETAIL & KURANGI STOK
+    # =========================================================
+
+    qty_per_produk = {}
+
+    for item in items:
+
+        id_produk = item.get("id_produk")
+
+        qty_per_produk[id_produk] = (
+            qty_per_produk.get(id_produk, 0) + item.get("qty")
+        )
+
+    # lock semua stok sekaligus, urut id_produk agar tidak deadlock
+    result_stok = connection.execute(text("""
+        SELECT id_produk, jumlah
+        FROM stok
+        WHERE id_lokasi = :id_lokasi
+        AND id_produk = ANY(:id_produk_list)
+        AND status = 1
+        ORDER BY id_produk
+        FOR UPDATE;
+    """), {
+        "id_lokasi": id_lokasi,
+        "id_produk_list": list(qty_per_produk)
+    }).mappings().fetchall()
+
+    stok_map = {
+        row["id_produk"]: row["jumlah"]
+        for row in result_stok
+    }
+
+    for id_produk, qty in qty_per_produk.items():
+
+        if id_produk not in stok_map:
+            STOK_RESERVASI_GAGAL_TOTAL.inc()
+            raise ValueError(
+                f"Stok produk ID {id_produk} tidak ditemukan."
+            )
+
+        if stok_map[id_produk] < qty:
+            STOK_RESERVASI_GAGAL_TOTAL.inc()
+            raise ValueError(
+                f"Stok tidak cukup untuk produk ID {id_produk}."
+            )
+
+    # kurangi stok (satu statement)
+    values_clause, values_params = _build_values(
+        ["id_produk", "qty"],
+        [
+            {"id_produk": id_produk, "qty": qty}
+            for id_produk, qty in qty_per_produk.items()
+        ]
+    )
+
+    connection.execute(text(f"""
+        UPDATE stok s
+        SET
+            jumlah = s.jumlah - v.qty,
+            updated_at = :timestamp_wita
+        FROM (VALUES {values_clause}) AS v(id_produk, qty)
+        WHERE s.id_lokasi = :id_lokasi
+        AND s.id_produk = v.id_produk
+        AND s.status = 1;
+    """), {
+        **values_params,
+        "id_lokasi": id_lokasi,
+        "timestamp_wita": timestamp_wita
+    })
+
+    # insert detail transaksi (multi-row)
+    values_clause, values_params = _build_values(
+        ["id_produk", "qty", "harga_jual"],
+        items
+    )
+
+    connection.execute(text(f"""
+        INSERT INTO detailtransaksi (
+            id_transaksi,
+            id_produk,
+            qty,
+            harga_jual,
+            status,
+            created_at,
+            updated_at
+        )
+        SELECT
+            :id_transaksi,
+            v.id_produk,
+            v.qty,
+            v.harga_jual,
+            1,
+            :timestamp_wita,
+            :timestamp_wita
+        FROM (VALUES {values_clause}) AS v(id_produk, qty, harga_jual);
+    """), {
+        **values_params,
+        "id_transaksi": id_transaksi,
+        "timestamp_wita": timestamp_wita
+    })
+
+    # =========================================================
+    # UPDATE ROLLUP PENJUALAN HARIAN
+    # =========================================================
+
+    upsert_penjualan_harian(
+        connection,
+        id_transaksi,
+        id_lokasi,
+        tanggal,
+        timestamp_wita
+    )
+
+    response = {
+        "id_transaksi": id_transaksi,
+        "id_pelanggan": id_pelanggan,
+        "earned_point": earned_point,
+        "total_point": total_poin if id_pelanggan else None,
+        "status_hutang": (
+            "belum lunas"
+            if tunai < total
+            else "lunas"
+        ),
+        "sisa_hutang": sisa_hutang,
+        "kembalian": kembalian
+    }
+
+    if idempotency_key:
+        save_idempotency_response(
+            connection,
+            idempotency_scope,
+            idempotency_key,
+            response
+        )
+
+    return response, False
+
+
+def insert_transaksi(payload, idempotency_key=None, idempotency_scope=None):
 
-            # =========================================================
-            # HITUNG POIN
-            # =========================================================
+    timestamp_wita = get_wita()
 
-            earned_point = 0
+    engine = get_connection()
 
-            if id_pelanggan:
+    try:
 
-                # =========================================================
-                # AMBIL PENGATURAN POIN
-                # =========================================================
+        with engine.begin() as connection:
 
-                setting = connection.execute(text("""
-                    SELECT value
-                    FROM pengaturan
-                    WHERE key = 'poin_kelipatan';
-                """)).mappings().fetchone()
+            response, replay = _insert_transaksi(
+                connection,
+                payload,
+                timestamp_wita,
+                timestamp_wita.date(),
+                idempotency_key,
+                idempotency_scope
+            )
 
-                poin_kelipatan = int(setting["value"]) if setting else 35000
+        # dihitung setelah commit; replay tidak dihitung ulang
+        if not replay:
+            CHECKOUT_TOTAL.inc()
 
-                # =========================================================
-                # HITUNG POIN
-                # =========================================================
+        return response
 
-                earned_point = total // poin_kelipatan
+    except ValueError as ve:
+        raise ve
 
-                if earned_point > 0:
+    except SQLAlchemyError as e:
+        print(f"DB Error: {str(e)}")
+        return None
 
-                    # update poin pelanggan
-                    connection.execute(text("""
-                        UPDATE pelanggan
-                        SET
-                            poin = poin + :earned_point,
-                            updated_at = :timestamp_wita
-                        WHERE id_pelanggan = :id_pelanggan
-                        AND status = 1
-                        RETURNING poin;
-                    """), {
-                        "earned_point": earned_point,
-                        "id_pelanggan": id_pelanggan,
-                        "timestamp_wita": timestamp_wita
-                    })
-
-                    # insert histori poin
-                    connection.execute(text("""
-                        INSERT INTO poin_pelanggan (
-                            id_pelanggan,
-                            id_transaksi,
-                            tipe,
-                            poin,
-                            deskripsi,
-                            status,
-                            created_at,
-                            updated_at
-                        )
-                        VALUES (
-                            :id_pelanggan,
-                            :id_transaksi,
-                            'earn',
-                            :earned_point,
-                            :deskripsi,
-                            1,
-                            :timestamp_wita,
-                            :timestamp_wita
-                        );
-                    """), {
-                        "id_pelanggan": id_pelanggan,
-                        "id_transaksi": id_transaksi,
-                        "earned_point": earned_point,
-                        "deskripsi": f"Poin dari transaksi #{id_transaksi}",
-                        "timestamp_wita": timestamp_wita
-                    })
-
-                total_poin = connection.execute(text("""
-                                SELECT poin FROM pelanggan
-                                WHERE id_pelanggan = :id_pelanggan
-                                AND status = 1
-                            """), {
-                                "id_pelanggan": id_pelanggan
-                            }).scalar()
 
-            # =========================================================
-            # INSERT HUTANG
-            # =========================================================
+# =========================================================
+# INSERT TRANSAKSI BATCH (SINKRONISASI OFFLINE)
+# =========================================================
 
-            if tunai < total:
-
-                connection.execute(text("""
-                    INSERT INTO hutang (
-                        id_transaksi,
-                        id_pelanggan,
-                        sisa_hutang,
-                        status_hutang,
-                        status,
-                        created_at,
-                        updated_at
-                    )
-                    VALUES (
-                        :id_transaksi,
-                        :id_pelanggan,
-                        :sisa_hutang,
-                        'belum lunas',
-                        1,
-                        :timestamp_wita,
-                        :timestamp_wita
-                    );
-                """), {
-                    "id_transaksi": id_transaksi,
-                    "id_pelanggan": id_pelanggan,
-                    "sisa_hutang": sisa_hutang,
-                    "timestamp_wita": timestamp_wita
-                })
+def _parse_waktu_transaksi(waktu_transaksi, timestamp_wita):
 
-            # =========================================================
-            # INSERT DETAIL & KURANGI STOK
-            # =========================================================
+    if not waktu_transaksi:
+        return timestamp_wita.date()
 
-            for item in items:
+    try:
+        waktu = datetime.fromisoformat(waktu_transaksi)
+    except (TypeError, ValueError):
+        raise ValueError(
+            "Format waktu_transaksi tidak valid (ISO 8601)."
+        )
 
-                id_produk = item.get("id_produk")
-                qty = item.get("qty")
-                harga_jual = item.get("harga_jual")
+    if waktu.tzinfo:
+        waktu = waktu.astimezone(
+            pytz.timezone('Asia/Makassar')
+        ).replace(tzinfo=None)
 
-                if not id_produk:
-                    raise ValueError("id_produk wajib diisi.")
+    if waktu.date() > timestamp_wita.date():
+        raise ValueError(
+            "waktu_transaksi tidak boleh melebihi hari ini."
+        )
 
-                if qty is None or qty <= 0:
-                    raise ValueError(
-                        f"Qty tidak valid untuk produk ID {id_produk}."
-                    )
+    return waktu.date()
 
-                if harga_jual is None or harga_jual < 0:
-                    raise ValueError(
-                        f"Harga jual tidak valid untuk produk ID {id_produk}."
-                    )
 
-                # lock stok
-                result_stok = connection.execute(text("""
-                    SELECT jumlah
-                    FROM stok
-                    WHERE id_lokasi = :id_lokasi
-                    AND id_produk = :id_produk
-                    AND status = 1
-                    FOR UPDATE;
-                """), {
-                    "id_lokasi": id_lokasi,
-                    "id_produk": id_produk
-                }).fetchone()
-
-                if not result_stok:
-                    raise ValueError(
-                        f"Stok produk ID {id_produk} tidak ditemukan."
-                    )
+def insert_transaksi_batch(entries, idempotency_scope=None):
 
-                if result_stok.jumlah < qty:
-                    raise ValueError(
-                        f"Stok tidak cukup untuk produk ID {id_produk}."
-                    )
+    timestamp_wita = get_wita()
 
-                # kurangi stok
-                connection.execute(text("""
-                    UPDATE stok
-                    SET
-                        jumlah = jumlah - :qty,
-                        updated_at = :timestamp_wita
-                    WHERE id_lokasi = :id_lokasi
-                    AND id_produk = :id_produk
-                    AND status = 1;
-                """), {
-                    "qty": qty,
-                    "id_lokasi": id_lokasi,
-                    "id_produk": id_produk,
-                    "timestamp_wita": timestamp_wita
-                })
-
-                # insert detail transaksi
-                connection.execute(text("""
-                    INSERT INTO detailtransaksi (
-                        id_transaksi,
-                        id_produk,
-                        qty,
-                        harga_jual,
-                        status,
-                        created_at,
-                        updated_at
-                    )
-                    VALUES (
-                        :id_transaksi,
-                        :id_produk,
-                        :qty,
-                        :harga_jual,
-                        1,
-                        :timestamp_wita,
-                        :timestamp_wita
-                    );
-                """), {
-                    "id_transaksi": id_transaksi,
-                    "id_produk": id_produk,
-                    "qty": qty,
-                    "harga_jual": harga_jual,
-                    "timestamp_wita": timestamp_wita
-                })
-
-            return {
-                "id_transaksi": id_transaksi,
-                "id_pelanggan": id_pelanggan,
-                "earned_point": earned_point,
-                "total_point": total_poin if id_pelanggan else None,
-                "status_hutang": (
-                    "belum lunas"
-                    if tunai < total
-                    else "lunas"
-                ),
-                "sisa_hutang": sisa_hutang,
-                "kembalian": kembalian
+    results = [None] * len(entries)
+    valid_entries = []
+
+    # =========================================================
+    # VALIDASI SEMUA TRANSAKSI
+    # =========================================================
+
+    for index, entry in enumerate(entries):
+
+        try:
+
+            validate_transaksi_payload(entry)
+
+            tanggal = _parse_waktu_transaksi(
+                entry.get("waktu_transaksi"),
+                timestamp_wita
+            )
+
+        except ValueError as ve:
+
+            results[index] = {
+                "index": index,
+                "status": "error",
+                "message": str(ve)
             }
+            continue
 
-    except ValueError as ve:
-        raise ve
+        valid_entries.append((index, entry, tanggal))
 
-    except SQLAlchemyError as e:
-        print(f"DB Error: {str(e)}")
-        return None
+    # =========================================================
+    # SATU DB TRANSACTION PER TRANSAKSI
+    # =========================================================
+    # lock stok dilepas setiap commit dan tetap urut id_produk per
+    # transaksi, sama seperti checkout kasir, sehingga tidak deadlock
+    # dan tidak menahan kasir lain selama seluruh batch
+
+    engine = get_connection()
+
+    for index, entry, tanggal in valid_entries:
+
+        try:
+
+            with engine.begin() as connection:
+
+                data, replay = _insert_transaksi(
+                    connection,
+                    entry,
+                    timestamp_wita,
+                    tanggal,
+                    entry.get("idempotency_key"),
+                    idempotency_scope
+                )
+
+            if not replay:
+                CHECKOUT_TOTAL.inc()
+
+            results[index] = {
+                "index": index,
+                "status": "success",
+                "data": data
+            }
+
+        except ValueError as ve:
+
+            results[index] = {
+                "index": index,
+                "status": "error",
+                "message": str(ve)
+            }
+
+        except SQLAlchemyError as e:
+
+            print(f"DB Error: {str(e)}")
+
+            results[index] = {
+                "index": index,
+                "status": "error",
+                "message": "Terjadi kesalahan pada database"
+            }
+
+    return results
 
 
 # =========================================================
@@ -570,39 +883,20 @@ def get_transaksi_by_id(id_transaksi):
                 "id_transaksi": id_transaksi
             }).mappings().fetchall()
 
+            rows = [dict(row) for row in result]
+
+            items_map = _get_items_by_transaksi(
+                connection,
+                [row["id_transaksi"] for row in rows]
+            )
+
             data = []
 
-            for row in result:
-
-                row_dict = dict(row)
-
-                if isinstance(row_dict["tanggal"], (date, datetime)):
-                    row_dict["tanggal"] = row_dict["tanggal"].isoformat()
-
-                detail_result = connection.execute(text("""
-                    SELECT
-                        dt.id_produk,
-                        pr.nama_produk,
-                        dt.qty,
-                        dt.harga_jual
-                    FROM detailtransaksi dt
-                    INNER JOIN produk pr
-                        ON dt.id_produk = pr.id_produk
-                    WHERE dt.id_transaksi = :id_transaksi
-                    AND dt.status = 1;
-                """), {
-                    "id_transaksi": row_dict["id_transaksi"]
-                }).mappings().fetchall()
-
-                row_dict["items"] = [
-                    {
-                        "id_produk": item["id_produk"],
-                        "nama_produk": item["nama_produk"],
-                        "qty": item["qty"],
-                        "harga_jual": item["harga_jual"]
-                    }
-                    for item in detail_result
-                ]
+            for row_dict in rows:
+
+                row_dict["items"] = items_map.get(
+                    row_dict["id_transaksi"], []
+                )
 
                 data.append(row_dict)
 
@@ -9,6 +9,7 @@ from flask_jwt_extended import jwt_required
 from sqlalchemy.exc import SQLAlchemyError
 
 from .query.q_reward_poin import *
+from .utils.resource_version import conditional_get
 
 
 reward_poin_ns = Namespace(
@@ -43,6 +44,7 @@ reward_poin_model = reward_poin_ns.model("RewardPoin", {
 class RewardPoinListResource(Resource):
 
     @jwt_required()
+    @conditional_get("reward_poin")
     def get(self):
         """
         akses: admin, kasir
@@ -1,6 +1,6 @@
 from flask import logging, request
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import get_jwt_identity, jwt_required
 from sqlalchemy.exc import SQLAlchemyError
 
 from .query.q_stok import *
@@ -19,6 +19,17 @@ stok_model = stok_ns.model("Stok", {
     "stok_optimal": fields.Integer(required=False, description="Batas stok optimal untuk produk"),
 })
 
+opname_item_model = stok_ns.model("StokOpnameItem", {
+    "id_lokasi": fields.Integer(required=True, description="lokasi stok"),
+    "id_produk": fields.Integer(required=True, description="id barang"),
+    "jumlah_fisik": fields.Integer(required=True, description="jumlah hasil hitung fisik"),
+})
+
+opname_model = stok_ns.model("StokOpname", {
+    "catatan": fields.String(required=False, description="Catatan opname"),
+    "items": fields.List(fields.Nested(opname_item_model), required=True, description=f"Hasil hitung (maks {OPNAME_MAX_BARIS} baris)"),
+})
+
 @stok_ns.route('/')
 class StokListResource(Resource):
     @jwt_required()
@@ -55,6 +66,32 @@ class StokListResource(Resource):
             return {'status': "Internal server error"}, 500
         
 
+@stok_ns.route('/opname')
+class StokOpnameResource(Resource):
+    @jwt_required()
+    @stok_ns.expect(opname_model)
+    def post(self):
+        """akses: admin, kasir; terapkan hasil stok opname sekaligus dan catat selisihnya"""
+        payload = request.get_json() or {}
+        try:
+            ringkasan = stok_opname(
+                payload.get("items"),
+                id_user=get_jwt_identity(),
+                catatan=payload.get("catatan"),
+            )
+            if not ringkasan:
+                return {"status": "error", "message": "Gagal menyimpan stok opname"}, 500
+            return {
+                "data": ringkasan,
+                "status": f"Stok opname disimpan: {ringkasan['jumlah_selisih']} dari {ringkasan['jumlah_baris']} stok berselisih"
+            }, 201
+        except ValueError as ve:
+            return {"status": "error", "message": str(ve)}, 400
+        except SQLAlchemyError as e:
+            logging.error(f"Database error: {str(e)}")
+            return {'status': "Internal server error"}, 500
+
+
 @stok_ns.route('/<int:id_stok>')
 class StokDetailResource(Resource):
     @jwt_required()
@@ -2,7 +2,7 @@
 
 from flask import logging, request
 from flask_restx import Namespace, Resource, fields
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import get_jwt_identity, jwt_required
 from sqlalchemy.exc import SQLAlchemyError
 from .query.q_transaksi import *
 
@@ -92,6 +92,33 @@ transaksi_model = transaksi_ns.model("Transaksi", {
 })
 
 
+# =========================================================
+# TRANSAKSI BATCH MODEL (SINKRONISASI OFFLINE)
+# =========================================================
+
+transaksi_offline_model = transaksi_ns.inherit("TransaksiOffline", transaksi_model, {
+
+    "waktu_transaksi": fields.String(
+        required=False,
+        description="Waktu transaksi asli di kasir (ISO 8601)"
+    ),
+
+    "idempotency_key": fields.String(
+        required=False,
+        description="Kunci unik transaksi dari antrean offline"
+    ),
+})
+
+transaksi_batch_model = transaksi_ns.model("TransaksiBatch", {
+
+    "transaksi": fields.List(
+        fields.Nested(transaksi_offline_model),
+        required=True,
+        description=f"Daftar transaksi (maks {TRANSAKSI_BATCH_MAX})"
+    )
+})
+
+
 # =========================================================
 # LIST TRANSAKSI
 # =========================================================
@@ -103,7 +130,9 @@ class TransaksiListResource(Resource):
         'id_pelanggan': 'Filter berdasarkan ID pelanggan',
         'tanggal': 'Filter berdasarkan tanggal transaksi (YYYY-MM-DD)',
         'status_hutang': 'Filter status hutang (lunas/belum lunas)',
-        'id_lokasi': 'Filter berdasarkan ID lokasi'
+        'id_lokasi': 'Filter berdasarkan ID lokasi',
+        'limit': f'Jumlah data per halaman (maks {TRANSAKSI_MAX_LIMIT})',
+        'cursor': 'Cursor halaman berikutnya (dari next_cursor)'
     })
 
     @jwt_required()
@@ -114,7 +143,7 @@ class TransaksiListResource(Resource):
 
         try:
 
-            result = get_all_transaksi()
+            result, next_cursor = get_all_transaksi()
 
             if not result:
                 return {
@@ -123,9 +152,17 @@ class TransaksiListResource(Resource):
                 }, 404
 
             return {
-                'data': result
+                'data': result,
+                'next_cursor': next_cursor
             }, 200
 
+        except ValueError as ve:
+
+            return {
+                "status": "error",
+                "message": str(ve)
+            }, 400
+
         except SQLAlchemyError as e:
 
             logging.error(f"Database error: {str(e)}")
@@ -136,16 +173,27 @@ class TransaksiListResource(Resource):
 
     @jwt_required()
     @transaksi_ns.expect(transaksi_model)
+    @transaksi_ns.doc(params={
+        'Idempotency-Key': {
+            'in': 'header',
+            'description': 'Kunci unik per transaksi; retry dengan kunci sama mengembalikan hasil awal'
+        }
+    })
     def post(self):
         """
         akses: admin, kasir
         """
 
         payload = request.get_json()
+        idempotency_key = request.headers.get("Idempotency-Key")
 
         try:
 
-            new_transaksi = insert_transaksi(payload)
+            new_transaksi = insert_transaksi(
+                payload,
+                idempotency_key,
+                get_jwt_identity()
+            )
 
             if not new_transaksi:
 
@@ -175,6 +223,47 @@ class TransaksiListResource(Resource):
             }, 500
 
 
+# =========================================================
+# BATCH TRANSAKSI
+# =========================================================
+
+@transaksi_ns.route('/batch')
+class TransaksiBatchResource(Resource):
+
+    @jwt_required()
+    @transaksi_ns.expect(transaksi_batch_model)
+    def post(self):
+        """
+        akses: admin, kasir; sinkronisasi antrean transaksi offline
+        """
+
+        payload = request.get_json() or {}
+        entries = payload.get("transaksi")
+
+        if not entries or not isinstance(entries, list):
+
+            return {
+                "status": "error",
+                "message": "Daftar transaksi tidak boleh kosong."
+            }, 400
+
+        if len(entries) > TRANSAKSI_BATCH_MAX:
+
+            return {
+                "status": "error",
+                "message": f"Maksimal {TRANSAKSI_BATCH_MAX} transaksi per batch."
+            }, 400
+
+        results = insert_transaksi_batch(entries, get_jwt_identity())
+
+        berhasil = sum(1 for r in results if r["status"] == "success")
+
+        return {
+            "data": results,
+            "status": f"{berhasil} dari {len(results)} transaksi berhasil disinkronkan"
+        }, 200
+
+
 # =========================================================
 # DETAIL TRANSAKSI
 # =========================================================
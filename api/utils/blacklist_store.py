@@ -1,7 +1,137 @@
-blacklist = set()
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from .config import get_connection
+
+# masa berlaku default jika token tidak membawa klaim exp (detik)
+DEFAULT_TOKEN_LIFETIME = 30 * 24 * 3600
+
+
+class RevocationStore(ABC):
+    """Interface penyimpanan token (JTI) yang sudah dicabut."""
+
+    @abstractmethod
+    def revoke(self, jti, expires_at):
+        ...
+
+    @abstractmethod
+    def is_revoked(self, jti):
+        ...
+
+
+class MemoryRevocationStore(RevocationStore):
+    """Hanya berlaku di satu worker; untuk development/testing."""
+
+    def __init__(self):
+        self._expiry = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, jti, expires_at):
+        now = time.time()
+        with self._lock:
+            self._expiry = {k: v for k, v in self._expiry.items() if v > now}
+            self._expiry[jti] = expires_at
+
+    def is_revoked(self, jti):
+        expires_at = self._expiry.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+
+class PostgresRevocationStore(RevocationStore):
+    """Disimpan di tabel token_revoked sehingga berlaku di semua worker."""
+
+    def revoke(self, jti, expires_at):
+        engine = get_connection()
+        with engine.begin() as connection:
+            connection.execute(text("""
+                INSERT INTO token_revoked (jti, expires_at)
+                VALUES (:jti, to_timestamp(:expires_at))
+                ON CONFLICT (jti) DO NOTHING
+            """), {"jti": jti, "expires_at": expires_at})
+
+            # buang token yang sudah kedaluwarsa
+            connection.execute(text("""
+                DELETE FROM token_revoked WHERE expires_at < now()
+            """))
+
+    def is_revoked(self, jti):
+        engine = get_connection()
+        with engine.connect() as connection:
+            result = connection.execute(text("""
+                SELECT 1 FROM token_revoked
+                WHERE jti = :jti AND expires_at > now()
+            """), {"jti": jti}).fetchone()
+            return result is not None
+
+
+class CachedRevocationStore(RevocationStore):
+    """
+    LRU per worker di depan store lain. Hasil "dicabut" disimpan sampai
+    token kedaluwarsa; hasil "aktif" hanya dipercaya selama `ttl` detik
+    agar logout di worker lain tetap cepat berlaku.
+    """
+
+    def __init__(self, backend, maxsize=10000, ttl=30):
+        self.backend = backend
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, jti, revoked, valid_until):
+        with self._lock:
+            self._cache[jti] = (revoked, valid_until)
+            self._cache.move_to_end(jti)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def revoke(self, jti, expires_at):
+        self.backend.revoke(jti, expires_at)
+        self._remember(jti, True, expires_at)
+
+    def is_revoked(self, jti):
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(jti)
+            if entry is not None:
+                self._cache.move_to_end(jti)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        revoked = self.backend.is_revoked(jti)
+        self._remember(jti, revoked, now + self.ttl)
+        return revoked
+
+
+def _create_store():
+    backend = os.getenv("TOKEN_REVOCATION_BACKEND", "postgres").lower()
+    if backend == "memory":
+        return MemoryRevocationStore()
+    return CachedRevocationStore(
+        PostgresRevocationStore(),
+        maxsize=int(os.getenv("TOKEN_REVOCATION_CACHE_SIZE", "10000")),
+        ttl=int(os.getenv("TOKEN_REVOCATION_CACHE_TTL", "30")),
+    )
+
+
+revocation_store = _create_store()
+
+
+def add_to_blacklist(jti, expires_at=None):
+    if expires_at is None:
+        expires_at = time.time() + DEFAULT_TOKEN_LIFETIME
+    revocation_store.revoke(jti, expires_at)
 
-def add_to_blacklist(jti):
-    blacklist.add(jti)
 
 def is_token_revoked(jti):
-    return jti in blacklist
+    try:
+        return revocation_store.is_revoked(jti)
+    except SQLAlchemyError as e:
+        print(f"Error cek token revoked: {str(e)}")
+        return True
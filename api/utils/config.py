@@ -1,8 +1,13 @@
+import logging
 import os
 import pytz
 from datetime import datetime
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from flask import g, has_request_context
+from sqlalchemy import create_engine, event, text
+
+from .db_instrumentation import instrument_engine
+from .metrics import InstrumentedQueuePool, instrument_pool
 
 
 # load .env
@@ -18,21 +23,141 @@ password = os.getenv("DB_PASS")
 
 DATABASE_URL = f'postgresql+psycopg2://{username}:{password}@{host}:{port}/{dbname}'
 
+# === Profil Pool Koneksi === #
+# Pilih dengan DB_POOL_PROFILE; tiap nilai bisa ditimpa env DB_POOL_SIZE, dst.
+# Total koneksi maksimum = jumlah worker gunicorn × (pool_size + max_overflow).
+DB_POOL_PROFILES = {
+    "small": {
+        "pool_size": 3,
+        "max_overflow": 2,
+        "pool_timeout": 10,
+        "statement_timeout": 15000,
+        "lock_timeout": 3000,
+    },
+    "default": {
+        "pool_size": 5,
+        "max_overflow": 2,
+        "pool_timeout": 15,
+        "statement_timeout": 30000,
+        "lock_timeout": 5000,
+    },
+    "large": {
+        "pool_size": 10,
+        "max_overflow": 5,
+        "pool_timeout": 30,
+        "statement_timeout": 60000,
+        "lock_timeout": 10000,
+    },
+}
+
+DB_POOL_PROFILE = os.getenv("DB_POOL_PROFILE", "default")
+_profile = DB_POOL_PROFILES.get(DB_POOL_PROFILE, DB_POOL_PROFILES["default"])
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", _profile["pool_size"]))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", _profile["max_overflow"]))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", _profile["pool_timeout"]))
+DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", _profile["statement_timeout"]))
+DB_LOCK_TIMEOUT = int(os.getenv("DB_LOCK_TIMEOUT_MS", _profile["lock_timeout"]))
+DB_APPLICATION_NAME = os.getenv("DB_APPLICATION_NAME", "be-toko-yani")
+
+# statement_timeout untuk job laporan & perintah CLI, bukan request (0 = tanpa batas)
+DB_LONG_STATEMENT_TIMEOUT = int(os.getenv("DB_LONG_STATEMENT_TIMEOUT_MS", "0"))
+
+
+def _create_engine(url, connect_args=None, **pool_kwargs):
+    created = create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=1800,
+        pool_pre_ping=True,  # opsional tapi direkomendasikan
+        connect_args={
+            "application_name": DB_APPLICATION_NAME,
+            "options": (
+                f"-c statement_timeout={DB_STATEMENT_TIMEOUT} "
+                f"-c lock_timeout={DB_LOCK_TIMEOUT}"
+            ),
+            **(connect_args or {}),
+        },
+        **pool_kwargs
+    )
+
+    # hitung query & waktu DB per request, catat slow query
+    instrument_engine(created)
+    event.listen(created, "checkout", _apply_request_statement_timeout)
+    return created
+
+
+def _apply_request_statement_timeout(dbapi_connection, connection_record, connection_proxy):
+    # statement_timeout khusus request (lihat decorator statement_timeout);
+    # SET LOCAL otomatis kembali ke default saat transaksi selesai
+    if has_request_context() and g.get("statement_timeout"):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("SET LOCAL statement_timeout = %s", (int(g.statement_timeout),))
+        cursor.close()
+
+
 # ⛽️ Engine dibuat sekali dan dipakai ulang (pool aman)
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=10,
-    max_overflow=5,
-    pool_timeout=30,
-    pool_recycle=1800,
-    pool_pre_ping=True  # opsional tapi direkomendasikan
-)
+engine = _create_engine(DATABASE_URL, poolclass=InstrumentedQueuePool)
+instrument_pool(engine)
+
+# === Read Replica (opsional) === #
+# Aktif jika DB_REPLICA_HOST diisi; kredensial default sama dengan primary.
+replica_host = os.getenv("DB_REPLICA_HOST")
+replica_engine = None
+
+if replica_host:
+    REPLICA_DATABASE_URL = (
+        f'postgresql+psycopg2://{os.getenv("DB_REPLICA_USER", username)}:'
+        f'{os.getenv("DB_REPLICA_PASS", password)}@{replica_host}:'
+        f'{os.getenv("DB_REPLICA_PORT", port)}/{os.getenv("DB_REPLICA_NAME", dbname)}'
+    )
+    # replica mati tidak boleh menahan request lama: gagal cepat lalu ke primary
+    replica_engine = _create_engine(
+        REPLICA_DATABASE_URL,
+        connect_args={"connect_timeout": int(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", "3"))}
+    )
+
 
 def get_connection():
     return engine  # engine ini global, tidak dibuat ulang
 
+
+def set_long_statement_timeout(connection):
+    """
+    Mengganti statement_timeout default koneksi (batas request) untuk job laporan
+    dan perintah CLI; is_local=true sehingga kembali ke default saat transaksi selesai.
+    """
+    connection.execute(
+        text("SELECT set_config('statement_timeout', :timeout, true)"),
+        {"timeout": str(DB_LONG_STATEMENT_TIMEOUT)}
+    )
+
+
+def check_pool_capacity(workers):
+    """
+    Peringatan jika workers × (pool_size + max_overflow) melebihi max_connections server.
+    Dipanggil dari hook gunicorn when_ready dan perintah `flask check-pool`, bukan saat import.
+    """
+    kebutuhan = workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    try:
+        with engine.connect() as connection:
+            max_connections = int(connection.execute(text("SHOW max_connections")).scalar())
+    except Exception as e:
+        logging.warning(f"Gagal cek max_connections: {str(e)}")
+        return None
+
+    if kebutuhan > max_connections:
+        logging.warning(
+            f"Pool DB berlebih: {workers} worker × ({DB_POOL_SIZE} + {DB_MAX_OVERFLOW}) "
+            f"= {kebutuhan} koneksi > max_connections {max_connections}. "
+            f"Kecilkan DB_POOL_PROFILE/DB_POOL_SIZE atau jumlah worker."
+        )
+    return kebutuhan <= max_connections
+
 # === Mencari Timestamp WITA === #
 def get_wita():
     wita = pytz.timezone('Asia/Makassar')
     now_wita = datetime.now(wita)
-    return now_wita.replace(tzinfo=None)
\ No newline at end of file
+    return now_wita.replace(tzinfo=None)
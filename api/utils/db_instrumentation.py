@@ -0,0 +1,53 @@
+import logging
+import os
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger("api.sql")
+
+# statement lebih lambat dari ini (ms) dicatat ke log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+
+
+def instrument_engine(engine):
+    """Pasang hook SQLAlchemy untuk menghitung query dan waktu DB per request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+
+        endpoint = "-"
+        if has_request_context():
+            g.db_queries = g.get("db_queries", 0) + 1
+            g.db_time = g.get("db_time", 0.0) + elapsed_ms
+            endpoint = request.endpoint or request.path
+
+        if elapsed_ms >= SLOW_QUERY_MS:
+            logger.warning(
+                "Slow query %.1f ms [%s]: %s",
+                elapsed_ms, endpoint, " ".join(statement.split())
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # statement gagal tidak memanggil after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+
+def register_db_headers(app):
+    """Header X-DB-Queries / X-DB-Time pada response saat debug mode."""
+
+    @app.after_request
+    def add_db_headers(response):
+        if app.debug:
+            response.headers["X-DB-Queries"] = str(g.get("db_queries", 0))
+            response.headers["X-DB-Time"] = f"{g.get('db_time', 0.0):.1f}ms"
+        return response
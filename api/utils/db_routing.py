@@ -0,0 +1,125 @@
+import os
+import re
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import text
+
+from .config import engine, replica_engine
+
+
+# Replica hanya dipakai jika ketinggalan paling lama sekian detik dari primary
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "2"))
+# Status replica di-cache sebentar agar tidak dicek di setiap query
+REPLICA_STATUS_TTL = 1
+
+# read-your-writes lintas worker: LSN primary setelah tulisan terakhir klien
+# dikirim balik lewat cookie & header, lalu dibandingkan dengan replay LSN replica
+WRITE_LSN_COOKIE = "db_write_lsn"
+WRITE_LSN_HEADER = "X-DB-Write-LSN"
+# setelah batas ini lag replica sudah dibatasi REPLICA_MAX_LAG_SECONDS
+WRITE_LSN_MAX_AGE = int(os.getenv("WRITE_LSN_MAX_AGE", "60"))
+
+_LSN_PATTERN = re.compile(r"^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$")
+
+_replica_status = {"as_of": 0.0, "replay_lsn": 0, "checked_at": 0.0}
+_lock = threading.Lock()
+
+
+def _parse_lsn(lsn):
+    """'16/B374D848' -> int; None jika format tidak valid."""
+    if not lsn or not _LSN_PATTERN.match(lsn):
+        return None
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+def _required_lsn():
+    # LSN tulisan terakhir klien ini (header didahulukan, lalu cookie)
+    if not has_request_context():
+        return None
+    if "write_lsn" not in g:
+        g.write_lsn = _parse_lsn(
+            request.headers.get(WRITE_LSN_HEADER) or request.cookies.get(WRITE_LSN_COOKIE)
+        )
+    return g.write_lsn
+
+
+def _replica_status_cached():
+    """(epoch data terbaru, replay LSN) replica, dicache REPLICA_STATUS_TTL detik."""
+    now = time.time()
+    with _lock:
+        if now - _replica_status["checked_at"] < REPLICA_STATUS_TTL:
+            return _replica_status["as_of"], _replica_status["replay_lsn"]
+
+    try:
+        # LSN primary dibaca lebih dulu: replica up-to-date hanya jika sudah menerapkan
+        # WAL sampai titik ini (receive = replay juga benar saat WAL receiver terputus)
+        with engine.connect() as connection:
+            primary_lsn = _parse_lsn(
+                connection.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+            )
+        with replica_engine.connect() as connection:
+            status = connection.execute(text("""
+                SELECT
+                    EXTRACT(EPOCH FROM pg_last_xact_replay_timestamp()) AS replay_at,
+                    pg_last_wal_replay_lsn()::text AS replay_lsn
+            """)).mappings().fetchone()
+        replay_lsn = _parse_lsn(status["replay_lsn"]) or 0
+        # tertinggal: umur transaksi terakhir yang diterapkan menentukan lag
+        as_of = now if replay_lsn >= primary_lsn else float(status["replay_at"] or 0)
+    except Exception as e:
+        print(f"Gagal cek status replica: {str(e)}")
+        as_of, replay_lsn = 0.0, 0
+
+    with _lock:
+        _replica_status.update(as_of=as_of, replay_lsn=replay_lsn, checked_at=now)
+    return as_of, replay_lsn
+
+
+def get_read_connection():
+    """Engine untuk query baca: replica jika cukup segar, selain itu primary."""
+    if replica_engine is None:
+        return engine
+
+    as_of, replay_lsn = _replica_status_cached()
+
+    if as_of < time.time() - REPLICA_MAX_LAG_SECONDS:
+        return engine
+
+    # read-your-writes: replica harus sudah menerapkan tulisan terakhir klien ini
+    required_lsn = _required_lsn()
+    if required_lsn is not None and replay_lsn < required_lsn:
+        return engine
+
+    return replica_engine
+
+
+def register_read_routing(app):
+    """Kirim LSN primary setelah request tulis yang sukses (POST/PUT/PATCH/DELETE)."""
+
+    @app.after_request
+    def _set_write_lsn(response):
+        if replica_engine is None:
+            return response
+        if request.method in ("GET", "HEAD", "OPTIONS") or response.status_code >= 400:
+            return response
+
+        # transaksi request sudah commit, jadi LSN saat ini >= LSN commit-nya
+        try:
+            with engine.connect() as connection:
+                lsn = connection.execute(text("SELECT pg_current_wal_lsn()::text")).scalar()
+        except Exception as e:
+            print(f"Gagal membaca LSN primary: {str(e)}")
+            return response
+
+        response.headers[WRITE_LSN_HEADER] = lsn
+        response.set_cookie(
+            WRITE_LSN_COOKIE,
+            lsn,
+            max_age=WRITE_LSN_MAX_AGE,
+            httponly=True,
+            samesite="Lax"
+        )
+        return response
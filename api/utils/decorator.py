@@ -1,6 +1,6 @@
 from functools import wraps
 from flask_jwt_extended import verify_jwt_in_request, get_jwt
-from flask import jsonify
+from flask import g, jsonify
 
 def role_required(expected_role):
     def wrapper(fn):
@@ -14,3 +14,14 @@ def role_required(expected_role):
             return fn(*args, **kwargs)
         return decorator
     return wrapper
+
+
+def statement_timeout(milliseconds):
+    """Batasi durasi statement SQL selama request ini (mis. laporan berat)."""
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            g.statement_timeout = milliseconds
+            return fn(*args, **kwargs)
+        return decorator
+    return wrapper
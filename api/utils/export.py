@@ -0,0 +1,44 @@
+import csv
+import io
+import json
+
+from flask import Response, stream_with_context
+
+from .helper import json_default
+
+EXPORT_FORMATS = ("csv", "ndjson")
+
+
+def _iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, default=json_default) + "\n"
+
+
+def _iter_csv(rows):
+    buffer = io.StringIO()
+    writer = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row.keys()))
+            writer.writeheader()
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
+def stream_export(rows, fmt, filename):
+    """
+    Response streaming CSV/NDJSON dari generator baris (dict).
+    Memori tetap konstan berapa pun jumlah barisnya.
+    """
+    if fmt == "csv":
+        body, mimetype = _iter_csv(rows), "text/csv"
+    else:
+        body, mimetype = _iter_ndjson(rows), "application/x-ndjson"
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
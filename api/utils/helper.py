@@ -1,4 +1,6 @@
-from datetime import date, datetime
+import base64
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 
 def serialize_datetime(obj):
     """
@@ -12,3 +14,102 @@ def serialize_datetime(obj):
     elif isinstance(obj, (datetime, date)):
         return obj.isoformat()
     return obj
+
+
+def encode_cursor(*values):
+    """
+    Membentuk cursor pagination (keyset) dari nilai kolom terakhir
+    pada halaman, misalnya (tanggal, id_transaksi).
+    """
+    raw = "|".join(
+        v.isoformat() if isinstance(v, (datetime, date)) else str(v)
+        for v in values
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, parts):
+    """
+    Mengurai cursor dari encode_cursor menjadi list string sepanjang `parts`.
+    Melempar ValueError jika cursor tidak valid.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor tidak valid.")
+
+    if len(values) != parts:
+        raise ValueError("Cursor tidak valid.")
+    return values
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ValueError(f"Format tanggal tidak valid: {value} (YYYY-MM-DD)")
+
+
+def date_range_filter(column, start_date, end_date, name="tanggal"):
+    """
+    Membentuk filter rentang tanggal half-open yang ramah index:
+    `column >= :start AND column < :end_plus_one`.
+    Dipakai sebagai pengganti `DATE(column) BETWEEN ...` agar btree index
+    pada kolom tetap terpakai. Mengembalikan (clause, params).
+    """
+    start = _parse_date(start_date)
+    end = _parse_date(end_date)
+
+    clause = f"{column} >= :{name}_start AND {column} < :{name}_end"
+    params = {
+        f"{name}_start": start,
+        f"{name}_end": end + timedelta(days=1),
+    }
+    return clause, params
+
+
+def json_default(obj):
+    """Fungsi `default` untuk json.dumps: date/datetime dan Decimal."""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Tipe {type(obj).__name__} tidak bisa di-serialize")
+
+
+# batas pencarian typeahead; index trigram (GIN) baru terpakai untuk
+# ILIKE '%kata%' minimal 3 karakter, lebih pendek jatuh ke seq scan
+SEARCH_MIN_LENGTH = 3
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 25
+
+
+def search_params(q, limit=None):
+    """
+    Validasi kata kunci typeahead dan membentuk parameter query:
+    `pola` (mengandung, untuk ILIKE + index trigram), `prefix` (untuk ranking),
+    dan `limit` yang dibatasi SEARCH_MAX_LIMIT. Melempar ValueError jika tidak valid.
+    """
+    q = (q or "").strip()
+    if len(q) < SEARCH_MIN_LENGTH:
+        raise ValueError(f"Kata kunci minimal {SEARCH_MIN_LENGTH} karakter.")
+
+    try:
+        limit = int(limit) if limit else SEARCH_DEFAULT_LIMIT
+    except (TypeError, ValueError):
+        raise ValueError("Parameter 'limit' harus berupa angka.")
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+    # escape wildcard LIKE agar input diperlakukan sebagai teks biasa
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return {
+        "q": q,
+        "pola": f"%{escaped}%",
+        "prefix": f"{escaped}%",
+        "limit": limit,
+    }
@@ -0,0 +1,123 @@
+"""
+Metrik Prometheus untuk request, pool koneksi, dan bisnis.
+
+Dengan beberapa worker gunicorn, set PROMETHEUS_MULTIPROC_DIR ke direktori
+kosong yang bisa ditulis sebelum aplikasi start; /metrics lalu
+menggabungkan nilai semua worker. Hook child_exit di gunicorn.conf.py
+membuang gauge milik worker yang sudah mati.
+"""
+import os
+import time
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latensi request per namespace dan route",
+    ["namespace", "route", "method", "status"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Request yang sedang diproses",
+    multiprocess_mode="livesum",
+)
+
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Koneksi pool yang sedang dipakai",
+    multiprocess_mode="livesum",
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Koneksi overflow di atas pool_size",
+    multiprocess_mode="livesum",
+)
+POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Waktu tunggu mendapatkan koneksi dari pool",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30),
+)
+
+CHECKOUT_TOTAL = Counter(
+    "transaksi_checkout_total",
+    "Transaksi (checkout) yang berhasil disimpan",
+)
+STOK_RESERVASI_GAGAL_TOTAL = Counter(
+    "stok_reservasi_gagal_total",
+    "Checkout yang gagal karena stok tidak ada atau tidak cukup",
+)
+POIN_REDEEM_TOTAL = Counter(
+    "poin_redeem_total",
+    "Jumlah poin pelanggan yang di-redeem",
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool yang mencatat waktu tunggu checkout ke POOL_WAIT."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start)
+
+
+def instrument_pool(engine):
+    """Perbarui gauge pool setiap koneksi dipinjam/dikembalikan."""
+
+    def update_pool_gauges(*args):
+        POOL_CHECKED_OUT.set(engine.pool.checkedout())
+        POOL_OVERFLOW.set(max(engine.pool.overflow(), 0))
+
+    event.listen(engine, "checkout", update_pool_gauges)
+    event.listen(engine, "checkin", update_pool_gauges)
+
+
+def register_metrics(app):
+    """Pasang pengukuran latensi request dan endpoint /metrics."""
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def observe_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            REQUESTS_IN_FLIGHT.dec()
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            REQUEST_LATENCY.labels(
+                namespace=route.strip("/").split("/")[0] or "root",
+                route=route,
+                method=request.method,
+                status=response.status_code,
+            ).observe(time.perf_counter() - start)
+        return response
+
+    @app.teardown_request
+    def finish_request(exc):
+        # request gagal dengan exception tidak melewati after_request
+        if g.pop("metrics_start", None) is not None:
+            REQUESTS_IN_FLIGHT.dec()
+
+    def metrics():
+        if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+        return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
+    app.add_url_rule("/metrics", "metrics", metrics)
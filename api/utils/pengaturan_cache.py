@@ -0,0 +1,121 @@
+import select
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from .config import get_connection
+
+# channel NOTIFY yang dikirim penulis pengaturan
+PENGATURAN_CHANNEL = "pengaturan_changed"
+
+# umur maksimum cache sebelum dibaca ulang dari DB (detik)
+PENGATURAN_TTL = 300
+
+_cache = {}
+_loaded_at = None  # None = belum pernah dimuat
+_lock = threading.Lock()
+
+# channel lain yang ikut didengarkan listener ini: channel -> fungsi tanpa argumen
+_listen_handlers = {}
+
+
+def _load_pengaturan(connection):
+    global _cache, _loaded_at
+    result = connection.execute(text("""
+        SELECT key, value FROM pengaturan
+    """)).mappings().fetchall()
+
+    with _lock:
+        _cache = {row["key"]: row["value"] for row in result}
+        _loaded_at = time.monotonic()
+
+
+def refresh_pengaturan(connection=None):
+    """
+    Membaca ulang seluruh tabel pengaturan ke cache worker ini.
+    Dengan `connection`, dibaca di transaksi pemanggil dan error diteruskan;
+    tanpa itu, gagal baca hanya dicatat dan cache lama tetap dipakai.
+    """
+    if connection is not None:
+        _load_pengaturan(connection)
+        return True
+
+    engine = get_connection()
+    try:
+        with engine.connect() as own_connection:
+            _load_pengaturan(own_connection)
+    except SQLAlchemyError as e:
+        print(f"Error refresh pengaturan: {str(e)}")
+        return False
+    return True
+
+
+def get_pengaturan(key, default=None, connection=None):
+    """
+    Nilai pengaturan dari cache; dibaca ulang jika melewati TTL.
+    Di dalam DB transaction, kirim `connection` agar tidak meminjam
+    koneksi kedua dari pool.
+    """
+    loaded_at = _loaded_at
+    if loaded_at is None or time.monotonic() - loaded_at > PENGATURAN_TTL:
+        refresh_pengaturan(connection)
+    return _cache.get(key, default)
+
+
+def notify_pengaturan_changed(connection, key):
+    """Memberi tahu worker lain; terkirim saat transaksi pemanggil commit."""
+    connection.execute(
+        text("SELECT pg_notify(:channel, :key)"),
+        {"channel": PENGATURAN_CHANNEL, "key": key}
+    )
+
+
+def add_listen_handler(channel, handler):
+    """Mendaftarkan channel NOTIFY tambahan; panggil sebelum listener dijalankan."""
+    _listen_handlers[channel] = handler
+
+
+def _listen_pengaturan():
+    handlers = {PENGATURAN_CHANNEL: refresh_pengaturan, **_listen_handlers}
+    while True:
+        raw_connection = None
+        try:
+            raw_connection = get_connection().raw_connection()
+            raw_connection.detach()  # koneksi khusus LISTEN, tidak kembali ke pool
+            dbapi_connection = raw_connection.driver_connection
+            dbapi_connection.autocommit = True
+            cursor = dbapi_connection.cursor()
+            for channel in handlers:
+                cursor.execute(f"LISTEN {channel};")
+
+            # perubahan selama listener belum aktif
+            for handler in handlers.values():
+                handler()
+
+            while True:
+                if select.select([dbapi_connection], [], [], PENGATURAN_TTL) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                if dbapi_connection.notifies:
+                    channels = {notify.channel for notify in dbapi_connection.notifies}
+                    dbapi_connection.notifies.clear()
+                    for channel in channels:
+                        handlers[channel]()
+        except Exception as e:
+            print(f"Error listener pengaturan: {str(e)}")
+            time.sleep(5)
+        finally:
+            if raw_connection is not None:
+                try:
+                    raw_connection.close()
+                except Exception:
+                    pass
+
+
+def start_pengaturan_listener():
+    """Menjalankan LISTEN pengaturan_changed (dan channel terdaftar) di thread latar."""
+    thread = threading.Thread(target=_listen_pengaturan, daemon=True)
+    thread.start()
+    return thread
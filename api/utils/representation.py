@@ -0,0 +1,24 @@
+from flask import make_response
+
+from .helper import json_default
+
+try:
+    import orjson
+except ImportError:  # orjson opsional; fallback ke json standar
+    orjson = None
+    import json
+
+
+def dumps(data):
+    """Serialize ke JSON bytes; date/datetime/Decimal ditangani langsung."""
+    if orjson is not None:
+        return orjson.dumps(data, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=json_default).encode()
+
+
+def output_json(data, code, headers=None):
+    """Representation 'application/json' untuk flask-restx Api."""
+    response = make_response(dumps(data), code)
+    response.headers["Content-Type"] = "application/json"
+    response.headers.extend(headers or {})
+    return response
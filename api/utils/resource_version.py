@@ -0,0 +1,92 @@
+from functools import wraps
+
+from flask import request
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.http import http_date
+from werkzeug.wrappers import Response
+
+from .config import get_connection
+
+
+def bump_resource_version(connection, *resources):
+    """Menaikkan versi resource di dalam transaksi penulis (ikut commit/rollback)."""
+    connection.execute(text("""
+        INSERT INTO resource_version (resource, versi, updated_at)
+        SELECT resource, 1, now() FROM unnest(CAST(:resources AS VARCHAR[])) AS resource
+        ON CONFLICT (resource) DO UPDATE
+        SET versi = resource_version.versi + 1,
+            updated_at = EXCLUDED.updated_at
+    """), {"resources": list(resources)})
+
+
+def get_resource_versions(connection, *resources):
+    """{resource: versi} di koneksi pemanggil; resource yang belum pernah ditulis bernilai 0."""
+    result = connection.execute(text("""
+        SELECT resource, versi
+        FROM resource_version
+        WHERE resource = ANY(:resources)
+    """), {"resources": list(resources)}).mappings().fetchall()
+    versi = {row["resource"]: row["versi"] for row in result}
+    return {resource: versi.get(resource, 0) for resource in resources}
+
+
+def get_resource_version(resource):
+    """(versi, updated_at) resource; None jika belum ada atau DB gagal."""
+    engine = get_connection()
+    try:
+        with engine.connect() as connection:
+            result = connection.execute(text("""
+                SELECT versi, updated_at
+                FROM resource_version
+                WHERE resource = :resource
+            """), {"resource": resource}).mappings().fetchone()
+            return dict(result) if result else None
+    except SQLAlchemyError as e:
+        print(f"Error occurred: {str(e)}")
+        return None
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return request.if_modified_since >= last_modified.replace(microsecond=0)
+    return False
+
+
+def conditional_get(resource):
+    """
+    ETag/Last-Modified dari versi resource; jika klien masih punya versi
+    terbaru, balas 304 tanpa menjalankan query list maupun serialisasi.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            # versi dibaca sebelum query list: jika ada tulisan di antaranya,
+            # klien hanya akan mengambil ulang pada polling berikutnya
+            version = get_resource_version(resource)
+            if version is None:
+                return fn(*args, **kwargs)
+
+            etag = f'{resource}-{version["versi"]}'
+            last_modified = version["updated_at"]
+            cache_headers = {
+                "ETag": f'W/"{etag}"',
+                "Last-Modified": http_date(last_modified),
+                "Cache-Control": "private, no-cache",
+            }
+
+            if _not_modified(etag, last_modified):
+                return Response(status=304, headers=cache_headers)
+
+            result = fn(*args, **kwargs)
+            if not isinstance(result, tuple):
+                result = (result, 200)
+            data, code = result[0], result[1]
+            headers = result[2] if len(result) > 2 else {}
+            if code != 200:
+                return result
+            return data, code, {**headers, **cache_headers}
+        return decorator
+    return wrapper
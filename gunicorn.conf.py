@@ -0,0 +1,25 @@
+# Konfigurasi gunicorn (dibaca otomatis dari direktori kerja), mis.:
+#   gunicorn -w 4 -b 0.0.0.0:5000 "api:api"
+
+import os
+
+
+def when_ready(server):
+    # cek kapasitas pool dengan jumlah worker sebenarnya (-w / workers)
+    from api.utils.config import check_pool_capacity, get_connection
+    check_pool_capacity(server.cfg.workers)
+    # koneksi master tidak boleh terbawa ke worker hasil fork
+    get_connection().dispose()
+
+
+def post_worker_init(worker):
+    # thread latar dimulai di tiap worker setelah fork, bukan di master (preload)
+    from api import start_background_tasks
+    start_background_tasks()
+
+
+def child_exit(server, worker):
+    # gauge livesum milik worker yang mati dibuang dari PROMETHEUS_MULTIPROC_DIR
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,24 @@
+-- Index komposit untuk filter rentang tanggal half-open
+-- (kolom >= :start AND kolom < :end_plus_one) pada laporan dan list.
+-- Jalankan di luar transaksi (CONCURRENTLY), misalnya:
+--   psql "$DATABASE_URL" -f migrations/001_index_rentang_tanggal.sql
+
+-- GET /transaksi/, laporan transaksi & penjualan item (filter lokasi)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transaksi_status_lokasi_tanggal
+    ON transaksi (status, id_lokasi, tanggal);
+
+-- laporan tanpa filter lokasi + keyset pagination (tanggal, id_transaksi)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transaksi_status_tanggal_id
+    ON transaksi (status, tanggal, id_transaksi);
+
+-- join detail item per transaksi
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_detailtransaksi_transaksi
+    ON detailtransaksi (id_transaksi, status);
+
+-- laporan stok berdasarkan updated_at
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_stok_status_updated_at
+    ON stok (status, updated_at);
+
+-- GET /mutasi-stok/ berdasarkan tanggal
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_mutasistok_status_tanggal
+    ON mutasistok (status, tanggal);
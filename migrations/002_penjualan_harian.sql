@@ -0,0 +1,19 @@
+-- Rollup penjualan harian per lokasi, produk dan harga jual.
+-- Diisi inkremental oleh insert_transaksi; isi ulang dari histori dengan:
+--   flask --app api rebuild-penjualan-harian
+
+CREATE TABLE IF NOT EXISTS penjualan_harian (
+    tanggal     DATE        NOT NULL,
+    id_lokasi   INTEGER     NOT NULL REFERENCES lokasi (id_lokasi),
+    id_produk   INTEGER     NOT NULL REFERENCES produk (id_produk),
+    harga_jual  INTEGER     NOT NULL,
+    qty         BIGINT      NOT NULL DEFAULT 0,
+    subtotal    BIGINT      NOT NULL DEFAULT 0,
+    modal       BIGINT      NOT NULL DEFAULT 0,
+    keuntungan  BIGINT      NOT NULL DEFAULT 0,
+    updated_at  TIMESTAMP   NOT NULL,
+    PRIMARY KEY (tanggal, id_lokasi, id_produk, harga_jual)
+);
+
+CREATE INDEX IF NOT EXISTS idx_penjualan_harian_produk_tanggal
+    ON penjualan_harian (id_produk, tanggal);
@@ -0,0 +1,13 @@
+-- Kunci idempotensi untuk POST /transaksi/ (header Idempotency-Key).
+-- Baris kedaluwarsa dihapus berkala oleh worker aplikasi.
+
+CREATE TABLE IF NOT EXISTS idempotency_key (
+    key           VARCHAR(255) PRIMARY KEY,
+    request_hash  CHAR(64)     NOT NULL,
+    response      JSONB,
+    created_at    TIMESTAMP    NOT NULL,
+    expires_at    TIMESTAMP    NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_key_expires_at
+    ON idempotency_key (expires_at);
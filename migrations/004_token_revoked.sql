@@ -0,0 +1,11 @@
+-- Daftar JTI token yang sudah logout (dipakai bersama semua worker).
+-- Baris kedaluwarsa dihapus otomatis setiap ada logout.
+
+CREATE TABLE IF NOT EXISTS token_revoked (
+    jti         VARCHAR(64) PRIMARY KEY,
+    expires_at  TIMESTAMPTZ NOT NULL,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_token_revoked_expires_at
+    ON token_revoked (expires_at);
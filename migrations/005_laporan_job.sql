@@ -0,0 +1,17 @@
+-- Job laporan asinkron (POST /laporan/jobs) beserta hasilnya.
+
+CREATE TABLE IF NOT EXISTS laporan_job (
+    id_job       VARCHAR(32)  PRIMARY KEY,
+    jenis        VARCHAR(32)  NOT NULL,
+    params       JSONB        NOT NULL,
+    params_hash  CHAR(64)     NOT NULL,
+    versi_data   VARCHAR(64)  NOT NULL,
+    status       VARCHAR(16)  NOT NULL,
+    result       JSONB,
+    error        TEXT,
+    created_at   TIMESTAMP    NOT NULL,
+    finished_at  TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_laporan_job_reuse
+    ON laporan_job (params_hash, versi_data, created_at DESC);
@@ -0,0 +1,11 @@
+-- Index unik barcode produk aktif untuk GET /produk/barcode/<code> (cold miss cache).
+-- Produk nonaktif (status = 0) boleh menyimpan barcode lama agar barcode bisa dipakai ulang.
+-- Cek duplikat dulu sebelum membuat index:
+--   SELECT barcode, COUNT(*) FROM produk
+--   WHERE status = 1 AND barcode <> '' GROUP BY barcode HAVING COUNT(*) > 1;
+-- Jalankan di luar transaksi (CONCURRENTLY), misalnya:
+--   psql "$DATABASE_URL" -f migrations/006_index_barcode_produk.sql
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_produk_barcode_aktif
+    ON produk (barcode)
+    WHERE status = 1 AND barcode <> '';
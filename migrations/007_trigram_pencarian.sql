@@ -0,0 +1,23 @@
+-- Index trigram untuk GET /produk/search dan GET /pelanggan/search
+-- (ILIKE '%kata%' dan similarity() memakai index GIN gin_trgm_ops).
+-- CREATE EXTENSION butuh hak superuser/owner database.
+-- Jalankan di luar transaksi (CONCURRENTLY), misalnya:
+--   psql "$DATABASE_URL" -f migrations/007_trigram_pencarian.sql
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_produk_nama_trgm
+    ON produk USING gin (nama_produk gin_trgm_ops)
+    WHERE status = 1;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_produk_barcode_trgm
+    ON produk USING gin (barcode gin_trgm_ops)
+    WHERE status = 1;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pelanggan_nama_trgm
+    ON pelanggan USING gin (nama_pelanggan gin_trgm_ops)
+    WHERE status = 1;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_pelanggan_kontak_trgm
+    ON pelanggan USING gin (kontak gin_trgm_ops)
+    WHERE status = 1;
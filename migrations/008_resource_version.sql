@@ -0,0 +1,13 @@
+-- Nomor versi per resource master data untuk ETag / conditional GET.
+-- Dinaikkan oleh fungsi insert/update/delete di q_lokasi, q_produk, q_stok,
+-- q_reward_poin dan q_pengaturan (lihat api/utils/resource_version.py).
+
+CREATE TABLE IF NOT EXISTS resource_version (
+    resource    VARCHAR(50) PRIMARY KEY,
+    versi       BIGINT NOT NULL DEFAULT 1,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO resource_version (resource)
+VALUES ('lokasi'), ('produk'), ('reward_poin'), ('pengaturan')
+ON CONFLICT (resource) DO NOTHING;
@@ -0,0 +1,24 @@
+-- Saldo hutang berjalan per pelanggan (denormalisasi dari tabel hutang):
+-- total_hutang = SUM(sisa_hutang) hutang aktif (status = 1) yang 'belum lunas'.
+-- Dijaga dalam transaksi yang sama oleh insert_transaksi, insert_hutang,
+-- update_hutang, delete_hutang dan bayar_hutang. Verifikasi/perbaiki dengan:
+--   flask --app api reconcile-total-hutang [--fix]
+
+ALTER TABLE pelanggan
+    ADD COLUMN IF NOT EXISTS total_hutang BIGINT NOT NULL DEFAULT 0;
+
+UPDATE pelanggan p
+SET total_hutang = h.total
+FROM (
+    SELECT id_pelanggan, SUM(sisa_hutang) AS total
+    FROM hutang
+    WHERE status = 1
+    AND status_hutang = 'belum lunas'
+    GROUP BY id_pelanggan
+) h
+WHERE p.id_pelanggan = h.id_pelanggan;
+
+-- GET /hutang/total: hanya pelanggan yang masih berhutang
+CREATE INDEX IF NOT EXISTS idx_pelanggan_total_hutang
+    ON pelanggan (total_hutang DESC)
+    WHERE total_hutang > 0;
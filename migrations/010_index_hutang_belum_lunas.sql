@@ -0,0 +1,8 @@
+-- Partial index hutang aktif yang belum lunas per pelanggan:
+-- GET /hutang/aging, bayar_hutang (FIFO) dan rekonsiliasi total_hutang.
+-- Jalankan di luar transaksi (CONCURRENTLY), misalnya:
+--   psql "$DATABASE_URL" -f migrations/010_index_hutang_belum_lunas.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_hutang_belum_lunas_pelanggan
+    ON hutang (id_pelanggan)
+    WHERE status = 1 AND status_hutang = 'belum lunas';
@@ -0,0 +1,9 @@
+-- Partial index untuk GET /hutang/ (keyset id_hutang DESC): hanya hutang aktif
+-- yang belum lunas, sehingga hutang lunas yang terus bertambah tidak ikut discan.
+-- Filter id_pelanggan memakai idx_hutang_belum_lunas_pelanggan (010).
+-- Jalankan di luar transaksi (CONCURRENTLY), misalnya:
+--   psql "$DATABASE_URL" -f migrations/011_index_hutang_belum_lunas_id.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_hutang_belum_lunas_id
+    ON hutang (id_hutang)
+    WHERE status = 1 AND status_hutang = 'belum lunas';
@@ -0,0 +1,27 @@
+-- Hasil stok opname (POST /stok/opname): satu baris header per posting,
+-- detail hanya untuk stok yang jumlah fisiknya berbeda dari sistem.
+
+CREATE TABLE IF NOT EXISTS stok_opname (
+    id_opname       SERIAL PRIMARY KEY,
+    id_user         INTEGER,
+    catatan         TEXT,
+    jumlah_baris    INTEGER NOT NULL DEFAULT 0,
+    jumlah_selisih  INTEGER NOT NULL DEFAULT 0,
+    total_selisih   BIGINT NOT NULL DEFAULT 0,
+    nilai_selisih   BIGINT NOT NULL DEFAULT 0,
+    created_at      TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS stok_opname_detail (
+    id_opname       INTEGER NOT NULL REFERENCES stok_opname (id_opname),
+    id_stok         INTEGER NOT NULL,
+    id_lokasi       INTEGER NOT NULL,
+    id_produk       INTEGER NOT NULL,
+    jumlah_sistem   INTEGER NOT NULL,
+    jumlah_fisik    INTEGER NOT NULL,
+    selisih         INTEGER NOT NULL,
+    PRIMARY KEY (id_opname, id_stok)
+);
+
+CREATE INDEX IF NOT EXISTS idx_stok_opname_detail_produk
+    ON stok_opname_detail (id_produk, id_lokasi);
@@ -0,0 +1,8 @@
+-- Idempotency-Key dicakup per user (identity JWT): kunci yang sama dari
+-- kasir berbeda tidak saling bertabrakan / saling me-replay.
+
+ALTER TABLE idempotency_key
+    ADD COLUMN IF NOT EXISTS scope VARCHAR(64) NOT NULL DEFAULT '';
+
+ALTER TABLE idempotency_key DROP CONSTRAINT IF EXISTS idempotency_key_pkey;
+ALTER TABLE idempotency_key ADD PRIMARY KEY (scope, key);
@@ -0,0 +1,78 @@
+"""
+Microbenchmark encoder respons JSON pada payload berbentuk get_all_stok:
+json standar (dengan konversi tanggal per baris seperti sebelumnya, dan dengan
+json_default) vs orjson (api.utils.representation.dumps). Tanpa database.
+
+    python scripts/bench_json_encoder.py --rows 50000
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson  # noqa: E402
+
+from api.utils.helper import json_default, serialize_datetime  # noqa: E402
+
+
+def payload_stok(rows):
+    """Baris sintetis dengan kolom & tipe yang sama dengan get_all_stok."""
+    kategori = ["Sembako", "Minuman", "Snack", "Rokok", "Perlengkapan"]
+    satuan = ["pcs", "kg", "dus", "botol", "bungkus"]
+    expired = date(2026, 1, 1)
+    return {"data": [
+        {
+            "id_stok": i,
+            "id_produk": 1 + i % 5000,
+            "id_lokasi": 1 + i % 10,
+            "jumlah": (i * 37) % 500,
+            "nama_produk": f"Produk {1 + i % 5000}",
+            "barcode": f"899{i:010d}",
+            "kategori": kategori[i % len(kategori)],
+            "satuan": satuan[i % len(satuan)],
+            "harga_beli": 1000 + (i % 50) * 500,
+            "harga_jual": 1500 + (i % 50) * 600,
+            "expired_date": expired + timedelta(days=i % 365) if i % 7 else None,
+            "stok_optimal": 20 + i % 30,
+            "nama_lokasi": f"Toko {1 + i % 10}",
+            "tipe": "toko" if i % 10 else "gudang",
+        }
+        for i in range(rows)
+    ]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5, help="ambil waktu tercepat dari n kali")
+    args = parser.parse_args()
+
+    data = payload_stok(args.rows)
+
+    kandidat = {
+        # jalur lama: konversi tanggal per baris lalu json standar
+        "json + serialize_datetime": lambda: json.dumps(serialize_datetime(data)).encode(),
+        "json.dumps(default=json_default)": lambda: json.dumps(data, default=json_default).encode(),
+        "orjson.dumps(default=json_default)": lambda: orjson.dumps(
+            data, default=json_default, option=orjson.OPT_NON_STR_KEYS
+        ),
+    }
+
+    # semua encoder harus menghasilkan dokumen yang sama
+    hasil = {nama: json.loads(fungsi()) for nama, fungsi in kandidat.items()}
+    assert all(h == hasil["json + serialize_datetime"] for h in hasil.values())
+
+    print(f"{args.rows} baris, {len(kandidat['orjson.dumps(default=json_default)']()) / 1e6:.1f} MB JSON")
+    acuan = None
+    for nama, fungsi in kandidat.items():
+        detik = min(timeit.repeat(fungsi, number=1, repeat=args.repeat))
+        acuan = acuan or detik
+        print(f"{nama:38s} {detik * 1000:8.1f} ms  {acuan / detik:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Benchmark laporan transaksi: modal per baris (N+1, implementasi lama) vs
+satu agregat CTE (fetch_laporan_transaksi).
+
+Data sintetis dibuat di schema terpisah (default: bench_laporan) pada database
+lokal, tabel aplikasi tidak disentuh. Contoh:
+
+    BENCH_DATABASE_URL=postgresql+psycopg2://postgres@localhost/postgres \\
+        python scripts/bench_laporan_transaksi.py --transaksi 100000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.query.q_laporan import _build_laporan_transaksi_query, fetch_laporan_transaksi  # noqa: E402
+
+
+BULAN_MULAI = date(2025, 1, 1)
+BULAN_AKHIR = date(2025, 1, 31)
+
+
+def _siapkan_schema(connection, schema, jumlah_transaksi, jumlah_produk, item_per_transaksi):
+    connection.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+    connection.execute(text(f"CREATE SCHEMA {schema}"))
+    connection.execute(text(f"SET search_path TO {schema}"))
+
+    # hanya kolom yang dipakai laporan transaksi
+    connection.execute(text("""
+        CREATE TABLE produk (
+            id_produk SERIAL PRIMARY KEY,
+            nama_produk VARCHAR(100),
+            harga_beli INTEGER,
+            harga_jual INTEGER,
+            status SMALLINT DEFAULT 1
+        );
+        CREATE TABLE transaksi (
+            id_transaksi SERIAL PRIMARY KEY,
+            id_kasir INTEGER,
+            id_lokasi INTEGER,
+            id_pelanggan INTEGER,
+            tanggal TIMESTAMP,
+            total INTEGER,
+            tunai INTEGER,
+            kembalian INTEGER,
+            status SMALLINT DEFAULT 1
+        );
+        CREATE TABLE detailtransaksi (
+            id_detail_transaksi SERIAL PRIMARY KEY,
+            id_transaksi INTEGER,
+            id_produk INTEGER,
+            qty INTEGER,
+            harga_jual INTEGER,
+            status SMALLINT DEFAULT 1
+        );
+        CREATE TABLE hutang (
+            id_hutang SERIAL PRIMARY KEY,
+            id_transaksi INTEGER,
+            id_pelanggan INTEGER,
+            sisa_hutang INTEGER,
+            status_hutang VARCHAR(20),
+            status SMALLINT DEFAULT 1
+        );
+    """))
+
+    connection.execute(text("""
+        INSERT INTO produk (nama_produk, harga_beli, harga_jual)
+        SELECT 'Produk ' || i, 1000 + (i % 50) * 500, 1500 + (i % 50) * 600
+        FROM generate_series(1, :jumlah_produk) AS i
+    """), {"jumlah_produk": jumlah_produk})
+
+    # transaksi tersebar merata sepanjang satu bulan, 3 lokasi
+    connection.execute(text("""
+        INSERT INTO transaksi (id_kasir, id_lokasi, id_pelanggan, tanggal, total, tunai, kembalian)
+        SELECT
+            1 + i % 5,
+            1 + i % 3,
+            CASE WHEN i % 4 = 0 THEN 1 + i % 200 END,
+            CAST(:mulai AS TIMESTAMP) + ((i * 26) % (31 * 86400)) * INTERVAL '1 second',
+            0, 0, 0
+        FROM generate_series(1, :jumlah_transaksi) AS i
+    """), {"mulai": BULAN_MULAI, "jumlah_transaksi": jumlah_transaksi})
+
+    connection.execute(text("""
+        INSERT INTO detailtransaksi (id_transaksi, id_produk, qty, harga_jual)
+        SELECT t.id_transaksi, p.id_produk, 1 + (t.id_transaksi + n) % 4, p.harga_jual
+        FROM transaksi t
+        CROSS JOIN generate_series(1, :item) AS n
+        INNER JOIN produk p ON p.id_produk = 1 + (t.id_transaksi * 7 + n * 13) % :jumlah_produk
+    """), {"item": item_per_transaksi, "jumlah_produk": jumlah_produk})
+
+    connection.execute(text("""
+        UPDATE transaksi t
+        SET total = d.total, tunai = d.total, kembalian = 0
+        FROM (
+            SELECT id_transaksi, SUM(qty * harga_jual) AS total
+            FROM detailtransaksi
+            GROUP BY id_transaksi
+        ) d
+        WHERE d.id_transaksi = t.id_transaksi
+    """))
+
+    connection.execute(text("""
+        INSERT INTO hutang (id_transaksi, id_pelanggan, sisa_hutang, status_hutang)
+        SELECT id_transaksi, id_pelanggan, total / 2, 'belum lunas'
+        FROM transaksi
+        WHERE id_pelanggan IS NOT NULL AND id_transaksi % 10 = 0
+    """))
+
+    # index produksi dari migrations/001 agar query lama juga memakai index
+    connection.execute(text("""
+        CREATE INDEX idx_transaksi_status_tanggal_id ON transaksi (status, tanggal, id_transaksi);
+        CREATE INDEX idx_detailtransaksi_transaksi ON detailtransaksi (id_transaksi, status);
+        CREATE INDEX idx_hutang_transaksi ON hutang (id_transaksi);
+    """))
+
+
+def laporan_lama(connection, start_date, end_date):
+    """Implementasi sebelum user-003: satu query modal untuk setiap transaksi."""
+    result = connection.execute(text("""
+        SELECT
+            t.id_transaksi, t.id_kasir, t.id_lokasi, t.id_pelanggan,
+            t.tanggal, t.total, t.tunai, t.kembalian,
+            COALESCE(h.sisa_hutang, 0) AS sisa_hutang,
+            COALESCE(h.status_hutang, 'lunas') AS status_hutang
+        FROM transaksi t
+        LEFT JOIN hutang h ON t.id_transaksi = h.id_transaksi
+        WHERE t.status = 1
+        AND DATE(t.tanggal) BETWEEN :start_date AND :end_date
+        ORDER BY t.tanggal DESC
+    """), {"start_date": start_date, "end_date": end_date}).mappings().fetchall()
+
+    data = []
+    for row in result:
+        row_dict = dict(row)
+        modal = connection.execute(text("""
+            SELECT
+                SUM(dt.qty * pr.harga_beli) AS total_modal
+            FROM detailtransaksi dt
+            INNER JOIN produk pr ON dt.id_produk = pr.id_produk
+            WHERE dt.id_transaksi = :id_transaksi AND dt.status = 1;
+        """), {"id_transaksi": row_dict["id_transaksi"]}).scalar() or 0
+        row_dict["modal"] = modal
+        row_dict["keuntungan"] = row_dict["total"] - modal
+        data.append(row_dict)
+    return data
+
+
+def _ukur(fungsi, ulang):
+    hasil, durasi = None, []
+    for _ in range(ulang):
+        mulai = time.perf_counter()
+        hasil = fungsi()
+        durasi.append(time.perf_counter() - mulai)
+    return hasil, min(durasi)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transaksi", type=int, default=100000)
+    parser.add_argument("--produk", type=int, default=2000)
+    parser.add_argument("--item", type=int, default=3, help="item per transaksi")
+    parser.add_argument("--ulang", type=int, default=3, help="ambil waktu tercepat dari n kali")
+    parser.add_argument("--schema", default="bench_laporan")
+    parser.add_argument("--keep", action="store_true", help="jangan hapus schema setelah selesai")
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        sys.exit("Isi BENCH_DATABASE_URL dengan database lokal (bukan produksi)")
+
+    engine = create_engine(url)
+    start_date, end_date = BULAN_MULAI.isoformat(), BULAN_AKHIR.isoformat()
+
+    with engine.connect() as connection:
+        mulai = time.perf_counter()
+        _siapkan_schema(connection, args.schema, args.transaksi, args.produk, args.item)
+        connection.commit()
+        connection.execute(text("ANALYZE"))
+        print(f"seed {args.transaksi} transaksi × {args.item} item: {time.perf_counter() - mulai:.1f} s")
+
+        connection.execute(text(f"SET search_path TO {args.schema}"))
+
+        lama, waktu_lama = _ukur(lambda: laporan_lama(connection, start_date, end_date), args.ulang)
+        baru, waktu_baru = _ukur(
+            lambda: fetch_laporan_transaksi(connection, start_date=start_date, end_date=end_date),
+            args.ulang
+        )
+
+        # hasil harus identik sebelum waktunya dibandingkan
+        assert len(lama) == len(baru), (len(lama), len(baru))
+        modal_lama = {row["id_transaksi"]: row["modal"] for row in lama}
+        assert all(modal_lama[row["id_transaksi"]] == row["modal"] for row in baru)
+
+        print(f"baris laporan        : {len(baru)}")
+        print(f"lama (N+1 query)     : {waktu_lama * 1000:10.1f} ms")
+        print(f"baru (agregat CTE)   : {waktu_baru * 1000:10.1f} ms")
+        print(f"percepatan           : {waktu_lama / waktu_baru:10.1f}x")
+
+        query, params = _build_laporan_transaksi_query(start_date=start_date, end_date=end_date)
+        plan = connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {query}"), params).scalars()
+        print("\nEXPLAIN ANALYZE (baru):")
+        print("\n".join(plan))
+
+        if not args.keep:
+            connection.execute(text(f"DROP SCHEMA {args.schema} CASCADE"))
+        connection.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+from api.query.q_idempotency import hash_payload
+
+
+def test_hash_payload_abaikan_field_pengiriman():
+    transaksi = {"id_kasir": 1, "id_lokasi": 2, "total": 10000, "tunai": 10000,
+                 "items": [{"id_produk": 3, "qty": 1, "harga_jual": 10000}]}
+    dari_batch = {**transaksi, "waktu_transaksi": "2025-01-31T10:00:00",
+                  "idempotency_key": "abc"}
+
+    assert hash_payload(transaksi) == hash_payload(dari_batch)
+
+
+def test_hash_payload_beda_isi_beda_hash():
+    assert hash_payload({"total": 10000}) != hash_payload({"total": 12000})
@@ -0,0 +1,29 @@
+from datetime import date
+
+from api.query import q_laporan_job
+
+
+def test_periode_relatif_dikunci_ke_tanggal_absolut():
+    today = date.today().isoformat()
+    assert q_laporan_job._resolve_periode({"periode": "today"}) == {
+        "start_date": today,
+        "end_date": today,
+    }
+
+
+def test_periode_beririsan_dengan_rentang_tanggal():
+    today = date.today()
+    params = q_laporan_job._resolve_periode({
+        "periode": "this_month",
+        "start_date": "2000-01-01",
+        "end_date": today.isoformat(),
+    })
+    assert params == {
+        "start_date": today.replace(day=1).isoformat(),
+        "end_date": today.isoformat(),
+    }
+
+
+def test_tanpa_periode_tidak_berubah():
+    params = {"id_produk": 3, "start_date": "2025-01-01", "end_date": "2025-01-31"}
+    assert q_laporan_job._resolve_periode(dict(params)) == params
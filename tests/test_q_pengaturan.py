@@ -0,0 +1,37 @@
+import time
+from contextlib import contextmanager
+
+from api.query import q_pengaturan
+from api.utils import pengaturan_cache
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def mappings(self):
+        return self
+
+    def fetchall(self):
+        return self._rows
+
+
+class _Connection:
+    def execute(self, statement, params=None):
+        return _Result([{"key": "poin_kelipatan", "value": "50000"}])
+
+
+class _Engine:
+    @contextmanager
+    def connect(self):
+        yield _Connection()
+
+
+def test_get_pengaturan_poin_membaca_db_bukan_cache_basi(monkeypatch):
+    # cache worker ini belum menerima NOTIFY dan masih dalam TTL
+    monkeypatch.setattr(pengaturan_cache, "_cache", {"poin_kelipatan": "35000"})
+    monkeypatch.setattr(pengaturan_cache, "_loaded_at", time.monotonic())
+    monkeypatch.setattr(q_pengaturan, "get_connection", lambda: _Engine())
+
+    assert q_pengaturan.get_pengaturan_poin() == {"poin_kelipatan": 50000}
+    assert pengaturan_cache.get_pengaturan("poin_kelipatan") == "50000"
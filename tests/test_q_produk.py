@@ -0,0 +1,51 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from api.query import q_produk
+
+
+class _Engine:
+    @contextmanager
+    def connect(self):
+        yield None
+
+
+@pytest.fixture(autouse=True)
+def katalog_kosong(monkeypatch):
+    monkeypatch.setattr(q_produk, "get_connection", lambda: _Engine())
+    monkeypatch.setattr(q_produk, "_katalog", {})
+    monkeypatch.setattr(q_produk, "_katalog_loaded_at", None)
+
+
+def test_refresh_tidak_menimpa_reset_yang_terjadi_selama_query(monkeypatch):
+    def fetch_lalu_reset(connection):
+        # produk berubah (NOTIFY) saat query katalog masih berjalan
+        q_produk.reset_katalog_produk()
+        return [{"barcode": "899", "harga_jual": 10000}]
+
+    monkeypatch.setattr(q_produk, "_fetch_all_produk", fetch_lalu_reset)
+    q_produk.refresh_katalog_produk()
+
+    assert q_produk._katalog_loaded_at is None
+    assert q_produk._katalog == {}
+
+
+def test_refresh_gagal_tidak_dipublikasikan(monkeypatch):
+    def fetch_gagal(connection):
+        raise OperationalError("SELECT", {}, Exception("koneksi putus"))
+
+    monkeypatch.setattr(q_produk, "_fetch_all_produk", fetch_gagal)
+    q_produk.refresh_katalog_produk()
+
+    assert q_produk._katalog_loaded_at is None
+
+
+def test_refresh_dipublikasikan(monkeypatch):
+    monkeypatch.setattr(q_produk, "_fetch_all_produk",
+                        lambda connection: [{"barcode": "899", "harga_jual": 10000}])
+    q_produk.refresh_katalog_produk()
+
+    assert q_produk._katalog_loaded_at is not None
+    assert q_produk._katalog["899"]["harga_jual"] == 10000
@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from api.query import q_transaksi
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def mappings(self):
+        return self
+
+    def fetchall(self):
+        return self._rows
+
+
+class _CountingConnection:
+    """Koneksi palsu: menghitung statement dan mengembalikan baris sesuai query."""
+
+    def __init__(self, total_transaksi):
+        self.statements = []
+        self.total_transaksi = total_transaksi
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.statements.append(sql)
+        if "FROM transaksi t" in sql:
+            return _Result(self._transaksi_rows(params["limit"]))
+        if "FROM detailtransaksi dt" in sql:
+            return _Result([
+                {"id_transaksi": id_transaksi, "id_produk": 1, "nama_produk": "Gula",
+                 "qty": 2, "harga_jual": 15000}
+                for id_transaksi in params["id_transaksi_list"]
+            ])
+        raise AssertionError(f"query tak terduga: {sql}")
+
+    def _transaksi_rows(self, limit):
+        mulai = datetime(2025, 1, 31, 12, 0)
+        return [
+            {"id_transaksi": self.total_transaksi - i, "id_pelanggan": i % 3 or None,
+             "tanggal": mulai - timedelta(minutes=i), "total_hutang": 0}
+            for i in range(min(limit, self.total_transaksi))
+        ]
+
+
+class _Engine:
+    def __init__(self, connection):
+        self._connection = connection
+
+    @contextmanager
+    def connect(self):
+        yield self._connection
+
+    @contextmanager
+    def begin(self):
+        yield self._connection
+
+
+def _jumlah_query(monkeypatch, limit):
+    connection = _CountingConnection(total_transaksi=500)
+    monkeypatch.setattr(q_transaksi, "get_read_connection", lambda: _Engine(connection))
+
+    with Flask(__name__).test_request_context(f"/transaksi/?limit={limit}"):
+        data, next_cursor = q_transaksi.get_all_transaksi()
+
+    assert len(data) == limit
+    assert next_cursor is not None
+    assert all(row["items"] for row in data)
+    return len(connection.statements)
+
+
+@pytest.mark.parametrize("limit", [1, 50, 200])
+def test_get_all_transaksi_jumlah_query_konstan(monkeypatch, limit):
+    # halaman + detail item (batch), tidak bertambah per baris
+    assert _jumlah_query(monkeypatch, limit) == _jumlah_query(monkeypatch, 1) == 2
+
+
+def _payload(*id_produk):
+    return {
+        "id_kasir": 1, "id_lokasi": 1, "total": 30000, "tunai": 30000,
+        "items": [{"id_produk": i, "qty": 1, "harga_jual": 15000} for i in id_produk],
+    }
+
+
+def test_validasi_menormalkan_id_produk_ke_int():
+    payload = _payload("12", 12)
+    q_transaksi.validate_transaksi_payload(payload)
+    assert [item["id_produk"] for item in payload["items"]] == [12, 12]
+    # hash idempotency sama untuk retry yang mengirim id_produk sebagai string
+    assert q_transaksi.hash_payload(payload) == q_transaksi.hash_payload(_payload(12, 12))
+
+
+@pytest.mark.parametrize("id_produk", ["12a", 1.5, True, [12]])
+def test_validasi_menolak_id_produk_tidak_valid(id_produk):
+    with pytest.raises(ValueError, match="id_produk tidak valid"):
+        q_transaksi.validate_transaksi_payload(_payload(id_produk))
+
+
+def test_replay_idempotency_tidak_menambah_checkout_total(monkeypatch):
+    tersimpan = {"id_transaksi": 7, "kembalian": 0}
+    monkeypatch.setattr(q_transaksi, "get_connection", lambda: _Engine(object()))
+    monkeypatch.setattr(q_transaksi, "claim_idempotency_key", lambda *args: tersimpan)
+
+    sebelum = q_transaksi.CHECKOUT_TOTAL._value.get()
+    assert q_transaksi.insert_transaksi(_payload(12), "kunci-1", "kasir-1") == tersimpan
+    assert q_transaksi.CHECKOUT_TOTAL._value.get() == sebelum